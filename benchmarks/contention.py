@@ -0,0 +1,156 @@
+"""Win rate of the real booking flow against competing synthetic clients.
+
+Each run starts the mock server, launches `N` synthetic buyers on the mock's
+event loop and runs BDRail.py against the same mock as a subprocess. The
+buyers poll `seat-layout` with different strategies and race for seats
+through `reserve-seat`. The mock resolves every race first come, first
+served, and counts only our reservations (synthetic buyers are told apart
+by their bearer token). For each load level the report gives our win rate
+(acks / reserve attempts that reached a seat race), how often we got every
+seat we wanted, and percentiles of booking-open -> ack for our seats.
+
+    python -m benchmarks.contention --competitors 0,50,200 --runs 3 --open-in 3 --mix steady=0.5,fast=0.3,sniper=0.2
+"""
+import argparse, asyncio, json, random, statistics, time
+import aiohttp
+import mock_server
+from seat_index import SeatIndex, select_seats
+from benchmarks.time_to_reserve import parse_env_overrides, percentile, run_once
+
+# Polling strategy -> (interval far from open, interval near open, seconds before open counted as near)
+STRATEGIES = {
+    "steady": (0.2, 0.2, 0.0),     # a person refreshing a few times a second
+    "fast": (0.02, 0.02, 0.0),     # a naive script polling flat out
+    "sniper": (1.0, 0.005, 1.0),   # idles, then polls hard from just before the (known) open instant
+}
+
+def parse_mix(spec):
+    """Parse "steady=0.5,fast=0.5" into ([names], [weights])."""
+    names, weights = [], []
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, weight = item.partition("=")
+        if name not in STRATEGIES:
+            raise ValueError(f"Unknown strategy '{name}' (expected one of {', '.join(STRATEGIES)})")
+        names.append(name)
+        weights.append(float(weight or 1))
+    return names, weights
+
+async def find_trip(session, base_url, config, headers):
+    params = {"from_city": "Dhaka", "to_city": "Parbatipur", "date_of_journey": "16-Mar-2025", "seat_class": config.seat_class}
+    async with session.get(f"{base_url}/bookings/search-trips-v2", params=params, headers=headers) as response:
+        trains = (await response.json())["data"]["trains"]
+    for train in trains:
+        if str(train["train_model"]) == str(config.train_number):
+            for seat in train["seat_types"]:
+                if seat["type"] == config.seat_class:
+                    return seat["trip_id"], seat["trip_route_id"]
+    raise RuntimeError("mock did not list the benchmarked trip")
+
+async def competitor(session, base_url, index, strategy, open_at, trip, seats_wanted, same_taste, rng):
+    far, near, window = STRATEGIES[strategy]
+    headers = {"Authorization": f"Bearer {mock_server.SYNTHETIC_TOKEN_PREFIX}{index}"}
+    trip_id, route_id = trip
+    await asyncio.sleep(rng.uniform(0, far))   # buyers do not start in lockstep
+
+    while True:
+        try:
+            async with session.get(f"{base_url}/bookings/seat-layout", headers=headers,
+                                   json={"trip_id": trip_id, "trip_route_id": route_id}) as response:
+                status = response.status
+                body = await response.read()
+            if status == 200:
+                break
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(near if open_at - time.monotonic() <= window else far)
+
+    seat_index = SeatIndex(json.loads(body)["data"]["seatLayout"])
+    if rng.random() < same_taste:
+        # The seats a default client (ours included) would pick
+        choice = list(select_seats(seat_index, [], seats_wanted))
+    else:
+        choice = [seat_index.ticket_id(i) for i in rng.sample(range(len(seat_index)), min(seats_wanted, len(seat_index)))]
+
+    async def reserve(ticket_id):
+        try:
+            async with session.patch(f"{base_url}/bookings/reserve-seat", headers=headers,
+                                     json={"ticket_id": ticket_id, "route_id": route_id}) as response:
+                await response.read()
+        except aiohttp.ClientError:
+            pass
+
+    await asyncio.gather(*(reserve(ticket_id) for ticket_id in choice))
+
+def competing_clients(count, mix, seats_wanted, same_taste, max_connections, seed):
+    """Background coroutine for run_once: `count` synthetic buyers with strategies drawn from `mix`."""
+    names, weights = mix
+
+    async def run(config, app):
+        if count == 0:
+            return
+        rng = random.Random(seed)
+        base_url = mock_server.base_url(config)
+        strategies = rng.choices(names, weights, k=count)
+        connector = aiohttp.TCPConnector(limit=max_connections)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            trip = await find_trip(session, base_url, config, {"Authorization": f"Bearer {mock_server.SYNTHETIC_TOKEN_PREFIX}search"})
+            await asyncio.gather(*(competitor(session, base_url, i, strategy, app["state"].open_at, trip,
+                                              seats_wanted, same_taste, random.Random(rng.random()))
+                                   for i, strategy in enumerate(strategies)))
+    return run
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the booking flow's win rate against competing synthetic clients.")
+    mock_server.add_config_arguments(parser)
+    parser.add_argument("--competitors", default="0,50,200", help="comma-separated numbers of competing clients (one level each)")
+    parser.add_argument("--mix", default="steady=0.5,fast=0.3,sniper=0.2", help=f"strategy weights ({', '.join(STRATEGIES)})")
+    parser.add_argument("--competitor-seats", type=int, default=2, help="seats each competitor tries to reserve")
+    parser.add_argument("--same-taste", type=float, default=0.5,
+                        help="probability that a competitor goes for the seats a default client would pick")
+    parser.add_argument("--max-connections", type=int, default=256, help="connection pool size shared by all competitors")
+    parser.add_argument("--runs", type=int, default=3, help="runs per load level")
+    parser.add_argument("--seats", type=int, default=2, help="MAX_SELECTABLE_SEAT for the booking flow")
+    parser.add_argument("--desired-seats", default="", help="DESIRED_SEATS for the booking flow")
+    parser.add_argument("--timeout", type=float, default=120.0, help="per-run timeout in seconds")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="extra environment for BDRail.py")
+    parser.add_argument("--verbose", action="store_true", help="show BDRail.py output")
+    args = parser.parse_args()
+    extra_env = parse_env_overrides(args.env)
+    mix = parse_mix(args.mix)
+    levels = [int(level) for level in args.competitors.split(",") if level.strip()]
+    wanted = min(args.seats, 4)
+
+    rows = []
+    for level in levels:
+        attempts = wins = full = rival_seats = layout_requests = 0
+        wall_total = 0.0
+        acks = []
+        for run in range(args.runs):
+            config = mock_server.config_from_args(args)
+            config.seed = args.seed + run
+            background = competing_clients(level, mix, args.competitor_seats, args.same_taste, args.max_connections, config.seed)
+            stats, wall, returncode = asyncio.run(run_once(config, args, extra_env, background))
+            attempts += stats["reserve_attempts"]
+            wins += stats["reserved_seats"]
+            full += stats["reserved_seats"] >= wanted
+            rival_seats += stats["synthetic_reserved_seats"]
+            layout_requests += stats["requests"].get("bookings/seat-layout", 0)
+            wall_total += wall
+            acks += stats["ack_after_open_ms"]
+            print(f"{level} competitors, run {run + 1}/{args.runs}: reserved {stats['reserved_seats']}/{wanted} "
+                  f"in {stats['reserve_attempts']} attempts, rivals hold {stats['synthetic_reserved_seats']}, exit {returncode}")
+        rows.append((level, attempts, wins, full, rival_seats / args.runs, layout_requests / wall_total if wall_total else 0.0, acks))
+
+    print()
+    print(f"{'competitors':>11} {'win rate':>9} {'full booking':>13} {'open->ack p50':>14} {'p90':>8} {'p99':>8} {'rival seats':>12} {'layout req/s':>13}")
+    for level, attempts, wins, full, rival_seats, layout_rate, acks in rows:
+        win_rate = f"{wins / attempts:.0%}" if attempts else "-"
+        latency = [f"{percentile(acks, pct):.1f}" if acks else "-" for pct in (50, 90, 99)]
+        print(f"{level:>11} {win_rate:>9} {f'{full}/{args.runs}':>13} {latency[0]:>14} {latency[1]:>8} {latency[2]:>8} "
+              f"{rival_seats:>12.1f} {layout_rate:>13.0f}")
+    all_acks = [ack for row in rows for ack in row[6]]
+    if all_acks:
+        print(f"\nopen -> ack over all levels (ms): median {statistics.median(all_acks):.1f}, max {max(all_acks):.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Micro-benchmark for decoding a large seat-layout response.
+
+    python -m benchmarks.layout_parse --coaches 20 --seats-per-coach 80
+"""
+import argparse, json, time
+import layout_parser
+import mock_server
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import simdjson
+except ImportError:
+    simdjson = None
+
+# Fields the real response carries per seat beyond what seat selection reads
+EXTRA_SEAT_FIELDS = {
+    "seat_type": "Window", "fare": 375.0, "vat_amount": 0, "route_id": 7001, "layout_id": 12,
+    "ticket_status": "Available", "description": "Shovan Chair seat", "coach_position": 3,
+}
+EXTRA_COACH_FIELDS = {"floor_id": 1, "coach_type": "S_CHAIR", "total_seat": 80, "remarks": None}
+
+def synthetic_body(coaches, seats_per_coach, availability):
+    layout = mock_server.build_seat_layout(
+        mock_server.MockConfig(coaches=coaches, seats_per_coach=seats_per_coach, availability=availability))
+    for coach in layout:
+        coach.update(EXTRA_COACH_FIELDS)
+        for row in coach["layout"]:
+            for seat in row:
+                seat.update(EXTRA_SEAT_FIELDS)
+    return json.dumps({"data": {"seatLayout": layout, "trip": {"trip_id": 5001}}}).encode()
+
+def timed(function, body, repeat):
+    function(body)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        function(body)
+    return (time.perf_counter() - started) / repeat * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare seat-layout decoding paths.")
+    parser.add_argument("--coaches", type=int, default=20)
+    parser.add_argument("--seats-per-coach", type=int, default=80)
+    parser.add_argument("--availability", type=float, default=0.5)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    body = synthetic_body(args.coaches, args.seats_per_coach, args.availability)
+    print(f"payload: {len(body) / 1024:.0f} KiB, {args.coaches * args.seats_per_coach} seats; fast path uses {layout_parser.DECODER}")
+
+    cases = [
+        ("json.loads (previous behaviour)", lambda b: json.loads(b)["data"]["seatLayout"]),
+        ("parse_seat_layout(fast=False)", lambda b: layout_parser.parse_seat_layout(b, fast=False)),
+    ]
+    if orjson is not None:
+        cases.append(("orjson.loads", lambda b: orjson.loads(b)["data"]["seatLayout"]))
+    if simdjson is not None:
+        cases.append(("simdjson full document", lambda b: simdjson.Parser().parse(b).as_dict()["data"]["seatLayout"]))
+        cases.append(("simdjson selective", layout_parser._parse_selective))
+    cases.append(("parse_seat_layout(fast=True)", layout_parser.parse_seat_layout))
+    cases.append(("parse_seat_layout, 422 body", lambda b: layout_parser.parse_seat_layout(
+        b'{"error":{"messages":["Ticket purchase for this trip will be available from 08:00 AM"]}}')))
+
+    baseline = None
+    for name, function in cases:
+        micros = timed(function, body, args.repeat)
+        baseline = baseline or micros
+        print(f"{name:36s} {micros:10.1f} us   {baseline / micros:5.2f}x")
+
+if __name__ == "__main__":
+    main()
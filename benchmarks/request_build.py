@@ -0,0 +1,91 @@
+"""Micro-benchmark for the client-side cost of one hot-loop request.
+
+Sends the seat-layout poll and the reserve-seat retry to a canned raw-socket
+responder (no HTTP framework, one fixed 422 reply) on a kept-alive
+connection and reports CPU time per request (best of interleaved rounds) for:
+
+    per-call    URL string and `json=` payload, as the loops used to send
+    template    a RequestTemplate: parsed URL and pre-encoded body, with prebuilt JSON headers
+
+The responder's share of the CPU time is the same in both, so the
+difference is what the template saves on the client.
+
+    python -m benchmarks.request_build --requests 5000 --rounds 5
+"""
+import argparse, asyncio, time
+import aiohttp
+from request_templates import JSON_CONTENT_TYPE, RequestTemplate
+
+NOT_OPEN = b'{"error":{"messages":["Ticket purchase for this trip will be available from 16-Mar-2025 08:00:00 AM"]}}'
+RESPONSE = (b"HTTP/1.1 422 Unprocessable Entity\r\nContent-Type: application/json\r\n"
+            b"Content-Length: " + str(len(NOT_OPEN)).encode() + b"\r\n\r\n" + NOT_OPEN)
+TOKEN = "eyJhbGciOiJIUzI1NiJ9." + "x" * 400 + ".signature"
+
+async def responder(reader, writer):
+    """Answer every request with RESPONSE; just enough HTTP/1.1 for aiohttp's keep-alive client."""
+    try:
+        while True:
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = 0
+            for line in head.split(b"\r\n"):
+                if line[:15].lower() == b"content-length:":
+                    length = int(line[15:])
+            if length:
+                await reader.readexactly(length)
+            writer.write(RESPONSE)
+    except (asyncio.IncompleteReadError, ConnectionError):
+        writer.close()
+
+async def measure(send, requests):
+    for _ in range(min(requests // 10, 500)):   # warm up the connection and code paths
+        async with send() as response:
+            await response.read()
+    cpu, wall = time.process_time(), time.perf_counter()
+    for _ in range(requests):
+        async with send() as response:
+            await response.read()
+    return (time.process_time() - cpu) / requests * 1e6, (time.perf_counter() - wall) / requests * 1e6
+
+async def run(requests, rounds):
+    server = await asyncio.start_server(responder, "127.0.0.1", 0)
+    base_url = f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}/v1.0/app"
+    headers = {"Authorization": f"Bearer {TOKEN}"}
+    json_headers = {**headers, "Content-Type": JSON_CONTENT_TYPE}
+    layout_payload = {"trip_id": 5001, "trip_route_id": 7001}
+    reserve_payload = {"ticket_id": 100001, "route_id": 7001}
+    layout = RequestTemplate("GET", f"{base_url}/bookings/seat-layout", layout_payload)
+    reserve = RequestTemplate("PATCH", f"{base_url}/bookings/reserve-seat", reserve_payload)
+
+    cases = [
+        ("seat-layout per-call", lambda http: http.get(f"{base_url}/bookings/seat-layout", headers=headers, json=layout_payload)),
+        ("seat-layout template", lambda http: layout.send(http, json_headers)),
+        ("reserve-seat per-call", lambda http: http.patch(f"{base_url}/bookings/reserve-seat", headers=headers, json=reserve_payload)),
+        ("reserve-seat template", lambda http: reserve.send(http, json_headers)),
+    ]
+    try:
+        async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=1)) as http:
+            best = {}
+            for _ in range(rounds):
+                # Interleaved so that drift (CPU frequency, GC) hits every case alike
+                for name, send in cases:
+                    cpu, wall = await measure(lambda: send(http), requests)
+                    best[name] = min(best.get(name, (cpu, wall)), (cpu, wall))
+            baseline = None
+            for name, _ in cases:
+                cpu, wall = best[name]
+                if name.endswith("per-call"):
+                    baseline = cpu
+                print(f"{name:24s} {cpu:7.1f} us CPU {wall:7.1f} us wall   {baseline - cpu:+6.1f} us ({(baseline - cpu) / baseline:+.0%}) vs per-call")
+    finally:
+        server.close()
+        await server.wait_closed()
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-call and templated request building.")
+    parser.add_argument("--requests", type=int, default=5000, help="requests per case and round")
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, args.rounds))
+
+if __name__ == "__main__":
+    main()
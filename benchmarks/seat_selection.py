@@ -0,0 +1,133 @@
+"""Speed and result quality of seat selection over synthetic layouts.
+
+Each scenario generates `--layouts` seat layouts (mock_server's generator,
+one seed per layout) of a given size and availability, optionally with a
+DESIRED_SEATS list drawn from all seat numbers of the layout, as a user who
+cannot see availability would write it. For every layout it times
+SeatIndex + select_seats and SeatIndex + rank_seats (as the booking flow
+calls them) and scores the select_seats choice:
+
+    filled      seats returned / seats that could have been (min(max, available))
+    same coach  choices with every seat in one coach, over the layouts where
+                one coach had that many seats available
+    contiguous  choices that are one run of consecutive seat numbers in one coach,
+                over the layouts where such a run existed
+    desired     available desired seats that were chosen, over those that fit
+
+    python -m benchmarks.seat_selection --layouts 50
+    python -m benchmarks.seat_selection --scenario sparse,huge --max-seats 2
+"""
+import argparse, random, time
+import mock_server
+from benchmarks.time_to_reserve import percentile
+from seat_index import SeatIndex, rank_seats, seat_position, select_seats
+
+# name -> (coaches, seats per coach, availability, desired seats listed)
+SCENARIOS = {
+    "typical": (10, 60, 0.4, 0),
+    "typical-desired": (10, 60, 0.4, 4),
+    "dense": (10, 60, 0.95, 0),
+    "sparse": (10, 60, 0.05, 0),
+    "sparse-desired": (10, 60, 0.05, 6),
+    "nearly-full": (20, 80, 0.01, 0),
+    "long-desired": (10, 60, 0.3, 40),
+    "huge": (60, 100, 0.5, 0),
+    "huge-sparse-desired": (60, 100, 0.02, 20),
+}
+
+def synthetic_layout(coaches, seats_per_coach, availability, seed):
+    config = mock_server.MockConfig(coaches=coaches, seats_per_coach=seats_per_coach, availability=availability, seed=seed)
+    return mock_server.build_seat_layout(config)
+
+def desired_seat_numbers(layout, count, rng):
+    numbers = [seat["seat_number"] for coach in layout for row in coach["layout"] for seat in row]
+    return rng.sample(numbers, min(count, len(numbers)))
+
+def coach_of(seat_number):
+    return seat_number.rpartition("-")[0]
+
+def is_contiguous(seat_numbers):
+    if len({coach_of(seat_number) for seat_number in seat_numbers}) != 1:
+        return False
+    positions = sorted(seat_position(seat_number, 0) for seat_number in seat_numbers)
+    return positions[-1] - positions[0] == len(positions) - 1
+
+def has_contiguous_run(index, size):
+    """Whether any coach has `size` available seats with consecutive numbers."""
+    return any(len(seats) >= size and index.contiguous_block(coach_index, size, 0, len(seats) - size + 1) is not None
+               for coach_index, seats in enumerate(index.coach_seats))
+
+def timed(function, repeat):
+    function()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - started) / repeat * 1e6
+
+def run_scenario(coaches, seats_per_coach, availability, desired_count, max_seats, spare, layouts, repeat, seed):
+    select_times, rank_times = [], []
+    filled = same_coach = same_coach_possible = contiguous = contiguous_possible = 0
+    desired_hits = desired_possible = 0
+    rng = random.Random(seed)
+    for n in range(layouts):
+        layout = synthetic_layout(coaches, seats_per_coach, availability, seed + n)
+        desired = desired_seat_numbers(layout, desired_count, rng)
+        select_times.append(timed(lambda: select_seats(SeatIndex(layout), desired, max_seats), repeat))
+        rank_times.append(timed(lambda: rank_seats(SeatIndex(layout), desired, max_seats, max_seats + spare), repeat))
+
+        index = SeatIndex(layout)
+        seat_numbers = list(select_seats(index, desired, max_seats).values())
+        wanted = min(max_seats, len(index))
+        filled += len(seat_numbers) / wanted if wanted else 1.0
+        if not seat_numbers:
+            continue
+        if any(end - first >= len(seat_numbers) for first, end in index.coach_ranges):
+            same_coach_possible += 1
+            same_coach += len({coach_of(seat_number) for seat_number in seat_numbers}) == 1
+        if has_contiguous_run(index, len(seat_numbers)):
+            contiguous_possible += 1
+            contiguous += is_contiguous(seat_numbers)
+        available_desired = [seat_number for seat_number in desired if index.available_seat(seat_number) is not None]
+        desired_possible += min(len(available_desired), max_seats)
+        desired_hits += len(set(available_desired) & set(seat_numbers))
+
+    return {
+        "select_p50_us": percentile(select_times, 50), "select_p99_us": percentile(select_times, 99),
+        "rank_p50_us": percentile(rank_times, 50), "rank_p99_us": percentile(rank_times, 99),
+        "filled": filled / layouts,
+        "same_coach": same_coach / same_coach_possible if same_coach_possible else None,
+        "contiguous": contiguous / contiguous_possible if contiguous_possible else None,
+        "desired": desired_hits / desired_possible if desired_possible else None,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Time seat selection and score its choices over synthetic layouts.")
+    parser.add_argument("--scenario", default=",".join(SCENARIOS), help=f"comma-separated scenarios ({', '.join(SCENARIOS)})")
+    parser.add_argument("--max-seats", type=int, default=4, help="MAX_SELECTABLE_SEAT")
+    parser.add_argument("--spare", type=int, default=4, help="RESERVE_SPARE_CANDIDATES, for the rank_seats timing")
+    parser.add_argument("--layouts", type=int, default=20, help="layouts generated per scenario")
+    parser.add_argument("--repeat", type=int, default=20, help="timed repetitions per layout")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.scenario.split(",") if name.strip()]
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+
+    def share(value):
+        return f"{value:.0%}" if value is not None else "-"
+
+    print(f"{'scenario':<20} {'seats':>6} {'avail':>6} {'desired':>7} {'select p50/p99 (us)':>20} {'rank p50/p99 (us)':>19} "
+          f"{'filled':>7} {'same coach':>10} {'contiguous':>10} {'desired':>8}")
+    for name in names:
+        coaches, seats_per_coach, availability, desired_count = SCENARIOS[name]
+        result = run_scenario(coaches, seats_per_coach, availability, desired_count, args.max_seats, args.spare,
+                              args.layouts, args.repeat, args.seed)
+        select = f"{result['select_p50_us']:.0f} / {result['select_p99_us']:.0f}"
+        rank = f"{result['rank_p50_us']:.0f} / {result['rank_p99_us']:.0f}"
+        print(f"{name:<20} {coaches * seats_per_coach:>6} {availability:>6.0%} {desired_count:>7} {select:>20} {rank:>19} "
+              f"{share(result['filled']):>7} {share(result['same_coach']):>10} {share(result['contiguous']):>10} {share(result['desired']):>8}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""End-to-end time-to-reserve benchmark against the local mock server.
+
+Starts mock_server.py in-process, runs the real BDRail.py flow against it as a
+subprocess and reports the time from booking-open to the first `ack: 1`
+reservation, as seen by the server.
+
+    python -m benchmarks.time_to_reserve --runs 5 --open-in 3 --latency-ms 30
+"""
+import argparse, asyncio, os, statistics, sys, tempfile, time
+import mock_server
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCHMARK_JOURNAL = os.path.join(tempfile.gettempdir(), "bdrail_benchmark_journal.jsonl")
+
+def booking_env(config, max_selectable_seat, desired_seats, extra_env):
+    env = dict(os.environ)
+    env.update({
+        "API_BASE_URL": mock_server.base_url(config),
+        "MOBILE_NUMBER": "01700000000",
+        "PASSWORD": "mock-password",
+        "FROM_CITY": "Dhaka",
+        "TO_CITY": "Parbatipur",
+        "DATE_OF_JOURNEY": "16-Mar-2025",
+        "SEAT_CLASS": config.seat_class,
+        "TRAIN_NUMBER": config.train_number,
+        "MAX_SELECTABLE_SEAT": str(max_selectable_seat),
+        "DESIRED_SEATS": desired_seats,
+        "PASSENGER_NAMES": ",".join(f"Passenger {i + 2}" for i in range(max_selectable_seat - 1)),
+        "PAYMENT_METHOD": "bkash",
+        "PYTHONUNBUFFERED": "1",
+        # Keep mock tokens out of the real token cache
+        "TOKEN_CACHE_FILE": os.path.join(tempfile.gettempdir(), "bdrail_benchmark_token_cache.json"),
+        # Every run books from scratch against a fresh mock
+        "BOOKING_JOURNAL": BENCHMARK_JOURNAL,
+    })
+    env.update(extra_env)
+    return env
+
+def interactive_answers(config, max_selectable_seat):
+    # Passengers and payment come from the environment; only the OTP is typed
+    return f"{config.otp}\n".encode()
+
+async def run_once(config, args, extra_env, background=None):
+    """One booking against a fresh mock. `background(config, app)`, if given, runs alongside it
+    on the mock's loop (e.g. competing clients) and is cancelled when the booking ends."""
+    if os.path.exists(BENCHMARK_JOURNAL):
+        os.remove(BENCHMARK_JOURNAL)
+    runner, app = await mock_server.start_mock_server(config)
+    background_task = asyncio.ensure_future(background(config, app)) if background else None
+    try:
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, os.path.join(REPO_ROOT, "BDRail.py"),
+            cwd=REPO_ROOT,
+            env=booking_env(config, args.seats, args.desired_seats, extra_env),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE if not args.verbose else None,
+            stderr=asyncio.subprocess.STDOUT if not args.verbose else None,
+        )
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(process.communicate(interactive_answers(config, args.seats)), args.timeout)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+        wall = time.perf_counter() - started
+        return app["state"].stats(), wall, process.returncode
+    finally:
+        if background_task:
+            background_task.cancel()
+            await asyncio.gather(background_task, return_exceptions=True)
+        await runner.cleanup()
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def parse_env_overrides(pairs):
+    overrides = {}
+    for pair in pairs:
+        key, _, value = pair.partition("=")
+        overrides[key] = value
+    return overrides
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure booking-open -> first reservation latency against the mock API.")
+    mock_server.add_config_arguments(parser)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--seats", type=int, default=2, help="MAX_SELECTABLE_SEAT for the booking flow")
+    parser.add_argument("--desired-seats", default="", help="DESIRED_SEATS for the booking flow")
+    parser.add_argument("--timeout", type=float, default=120.0, help="per-run timeout in seconds")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="extra environment for BDRail.py")
+    parser.add_argument("--verbose", action="store_true", help="show BDRail.py output")
+    args = parser.parse_args()
+    extra_env = parse_env_overrides(args.env)
+
+    results = []
+    for run in range(args.runs):
+        config = mock_server.config_from_args(args)
+        config.seed = args.seed + run
+        stats, wall, returncode = asyncio.run(run_once(config, args, extra_env))
+        delta = stats["first_ack_after_open_ms"]
+        results.append(delta)
+        shown = f"{delta:8.1f} ms" if delta is not None else "  no reservation"
+        print(f"run {run + 1}/{args.runs}: open -> first ack {shown}  "
+              f"(seat-layout polls: {stats['requests'].get('bookings/seat-layout', 0)}, "
+              f"reserved: {stats['reserved_seats']}, wall {wall:.1f}s, exit {returncode})")
+
+    reserved = [r for r in results if r is not None]
+    print()
+    print(f"successful runs: {len(reserved)}/{len(results)}")
+    if reserved:
+        print(f"open -> first ack (ms): min {min(reserved):.1f}  median {statistics.median(reserved):.1f}  "
+              f"p90 {percentile(reserved, 90):.1f}  max {max(reserved):.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Append-only, crash-safe journal of completed booking steps.
+
+Each completed step is appended as one JSON line and fsync'ed before the
+flow moves on, so a process that dies after reserving seats can be restarted
+straight into the next step instead of logging in, searching and polling
+again while the seat hold runs out. A torn last line (crash mid-write) is
+ignored. The journal only resumes the booking it was written for (same
+mobile number, route and date) and only while the seat hold can still be
+alive.
+"""
+import json, os, time
+
+class BookingJournal:
+    def __init__(self, path, booking_key):
+        self.path = path
+        self.booking_key = booking_key
+        self.fd = None
+
+    def load(self):
+        """Entries journaled for this booking, oldest first."""
+        entries = []
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        break   # torn write from a crash; nothing after it was acknowledged
+        except OSError:
+            return []
+        if not entries or entries[0].get("booking") != self.booking_key:
+            return []
+        return entries
+
+    def resume(self, hold_seconds):
+        """State to resume from, or None when there is nothing (still) resumable.
+
+        The returned dict merges all journaled data and carries the last `step`
+        plus `reserved_at`, the wall-clock time the first seats were reserved
+        (seats added later, e.g. by the cancellation watch, journal again), and
+        `otp_requested_at`, when the latest OTP was requested.
+        """
+        entries = self.load()
+        state = {}
+        for entry in entries:
+            state.update(entry)
+            if entry["step"] == "reserved":
+                state.setdefault("reserved_at", entry["at"])   # the earliest hold runs out first
+            elif entry["step"] == "otp-requested":
+                state["otp_requested_at"] = entry["at"]
+        if state.get("step") not in ("reserved", "otp-requested", "otp-verified", "confirm-failed"):
+            return None
+        if time.time() - state["reserved_at"] > hold_seconds:
+            return None
+        self._open()
+        return state
+
+    def begin(self):
+        """Start a new journal for this booking, discarding any previous one."""
+        self.close()
+        tmp_path = f"{self.path}.tmp"
+        with open(os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w", encoding="utf-8") as f:
+            f.write(json.dumps({"step": "started", "at": time.time(), "booking": self.booking_key}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._open()
+
+    def record(self, step, **data):
+        """Append a completed step and make it durable before returning."""
+        if self.fd is None:
+            self._open()
+        line = json.dumps({"step": step, "at": time.time(), **data}) + "\n"
+        os.write(self.fd, line.encode())
+        os.fsync(self.fd)
+
+    def _open(self):
+        if self.fd is None:
+            self.fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
@@ -0,0 +1,1056 @@
+"""The booking flow as a library: a BookingConfig and a BookingSession per account.
+
+A BookingSession holds everything one booking needs (auth token, trip
+options, ticket ids, journal, OTP receiver, rate controller) as explicit
+state and exposes each step - sign-in, trip search, polling, seat selection,
+reservation, OTP and confirm - as its own coroutine, so steps can be timed
+and exercised in isolation. Any number of sessions can run on one event loop
+and share one pooled aiohttp.ClientSession (see `create_http_session`).
+BDRail.py is the command-line entry point built on top of this module.
+"""
+import time, os, aiohttp, asyncio, json, logging, ssl
+from dataclasses import dataclass, field
+from colorama import Fore
+from release_scheduler import ReleaseScheduler
+from connection_warmup import ConnectionWarmer, HandshakeTimer
+from hedging import HedgedPoller
+from rate_control import AdaptiveRateController, parse_budgets, parse_retry_after
+from seat_index import SeatIndex, rank_seats
+from layout_parser import parse_seat_layout, DECODER
+from request_templates import JSON_CONTENT_TYPE, RequestTemplate
+from endpoint_client import ApiError, EndpointClient, NOT_OPEN, RETRY_AFTER, SEAT_LIMIT, SEAT_TAKEN, is_retryable, parse_policies
+from token_cache import TokenCache, decode_token, user_info
+from trip_resolver import SearchCache, TripOption, index_trains, parse_preferences, resolve_trips
+from run_metrics import RunMetrics
+import console_log
+from otp_sources import OtpSourceClosed, build_otp_receiver
+from booking_journal import BookingJournal
+from cancellation_watch import AvailabilityDiff
+from console_log import log
+
+SERVER_SEAT_LIMIT = 4  # the server rejects a fifth reserved seat per order
+
+# Payment methods in menu order: confirm payload changes for each (None removes the key)
+PAYMENT_METHODS = {
+    "bkash":      ("bKash",      {}),
+    "nagad":      ("Nagad",      {"is_bkash_online": False, "selected_mobile_transaction": 3}),
+    "rocket":     ("Rocket",     {"is_bkash_online": False, "selected_mobile_transaction": 4}),
+    "upay":       ("Upay",       {"is_bkash_online": False, "selected_mobile_transaction": 5}),
+    "visa":       ("VISA",       {"is_bkash_online": False, "selected_mobile_transaction": None, "pg": "visa"}),
+    "mastercard": ("Mastercard", {"is_bkash_online": False, "selected_mobile_transaction": None, "pg": "mastercard"}),
+    "nexus":      ("DBBL Nexus", {"is_bkash_online": False, "selected_mobile_transaction": None, "pg": "nexus"}),
+}
+
+OTP_PLACEHOLDER = "__OTP__"
+
+class BookingAborted(Exception):
+    """The booking cannot go on (order limit, no trip, no token). The reason has already been printed."""
+
+def _flag(value):
+    return value.lower() not in ("0", "false", "no")
+
+def _items(value):
+    return [item.strip() for item in (value or "").split(',') if item.strip()]
+
+@dataclass
+class BookingConfig:
+    # Credentials and journey
+    mobile_number: str = None
+    password: str = None
+    from_city: str = None
+    to_city: str = None
+    date_of_journey: str = None
+    seat_class: str = None
+    train_number: str = None
+    max_selectable_seat: int = 1
+    desired_seats: list = field(default_factory=list)
+    train_preferences: str = None          # "705:S_CHAIR,705:SNIGDHA,753:S_CHAIR"; defaults to train_number:seat_class
+
+    # The account holder travels on the first seat under the account's name. The passenger lists
+    # cover only the seats after it, in the same order (names are asked for by collect_booking_details
+    # if missing, genders and types default to male / Adult); then how to pay
+    account_holder_gender: str = "male"
+    account_holder_type: str = "Adult"
+    passenger_names: list = field(default_factory=list)
+    passenger_genders: list = field(default_factory=list)
+    passenger_types: list = field(default_factory=list)
+    payment_method: str = ""
+
+    # OTP sources raced against each other: stdin, file, fifo, http
+    otp_sources: str = "stdin"
+    otp_file: str = ".bdrail_otp"
+    otp_fifo: str = ".bdrail_otp.fifo"
+    otp_http_host: str = "127.0.0.1"
+    otp_http_port: int = 8765
+    otp_http_token: str = None
+
+    # Crash-safe journal of completed steps (None disables resuming)
+    booking_journal: str = ".bdrail_journal.jsonl"
+    reservation_hold: float = 600.0        # how long reserved seats stay ours
+    otp_validity: float = 120.0            # after this, resuming requests a new OTP
+
+    search_cache_ttl: float = 60.0
+    reserve_spare_candidates: int = 8      # spare ranked seats to refill failed reservations
+    parallel_trips: int = 1                # poll this many of the top-ranked trips at once
+    cancellation_watch: float = 0.0        # after open, watch this many seconds for freed seats (0 disables)
+    cancellation_watch_interval: float = 0.25
+
+    api_base_url: str = "https://railspaapi.shohoz.com/v1.0/app"
+    release_burst_window: float = 2.0
+    idle_poll_interval: float = 5.0
+    server_utc_offset: float = 6.0         # Bangladesh time
+    verify_ssl: bool = True
+    prewarm_connections: int = 4
+    prewarm_lead: float = 10.0
+    keepalive_ping_interval: float = 5.0
+    connection_keepalive: float = 60.0
+    hedge_requests: int = 1
+    hedge_stagger: float = 0.005           # seconds
+    rate_limits: str = None                # see rate_control.py
+    retry_policies: str = None             # see endpoint_client.py
+    fast_layout_parse: bool = True
+
+    use_token_cache: bool = True
+    token_cache_file: str = ".bdrail_token_cache.json"
+    token_refresh_lead: float = 300.0
+
+    log_level: str = "INFO"
+    metrics_json_file: str = None
+    metrics_prometheus_file: str = None
+
+    @classmethod
+    def from_env(cls, env=None):
+        """Build a config from environment variables (the names documented in the README)."""
+        env = os.environ if env is None else env
+        return cls(
+            mobile_number=env.get("MOBILE_NUMBER"),
+            password=env.get("PASSWORD"),
+            from_city=env.get("FROM_CITY"),
+            to_city=env.get("TO_CITY"),
+            date_of_journey=env.get("DATE_OF_JOURNEY"),
+            seat_class=env.get("SEAT_CLASS"),
+            train_number=env.get("TRAIN_NUMBER"),
+            max_selectable_seat=int(env.get("MAX_SELECTABLE_SEAT")),
+            desired_seats=env.get("DESIRED_SEATS").split(',') if env.get("DESIRED_SEATS") else [],
+            train_preferences=env.get("TRAIN_PREFERENCES"),
+            account_holder_gender=env.get("ACCOUNT_HOLDER_GENDER", "male").strip(),
+            account_holder_type=env.get("ACCOUNT_HOLDER_TYPE", "Adult").strip(),
+            passenger_names=_items(env.get("PASSENGER_NAMES")),
+            passenger_genders=_items(env.get("PASSENGER_GENDERS")),
+            passenger_types=_items(env.get("PASSENGER_TYPES")),
+            payment_method=env.get("PAYMENT_METHOD", "").strip().lower(),
+            otp_sources=env.get("OTP_SOURCES", "stdin"),
+            otp_file=env.get("OTP_FILE", ".bdrail_otp"),
+            otp_fifo=env.get("OTP_FIFO", ".bdrail_otp.fifo"),
+            otp_http_host=env.get("OTP_HTTP_HOST", "127.0.0.1"),
+            otp_http_port=int(env.get("OTP_HTTP_PORT", "8765")),
+            otp_http_token=env.get("OTP_HTTP_TOKEN"),
+            booking_journal=env.get("BOOKING_JOURNAL", ".bdrail_journal.jsonl"),
+            reservation_hold=float(env.get("RESERVATION_HOLD", "600")),
+            otp_validity=float(env.get("OTP_VALIDITY", "120")),
+            search_cache_ttl=float(env.get("SEARCH_CACHE_TTL", "60")),
+            reserve_spare_candidates=int(env.get("RESERVE_SPARE_CANDIDATES", "8")),
+            parallel_trips=int(env.get("PARALLEL_TRIPS", "1")),
+            cancellation_watch=float(env.get("CANCELLATION_WATCH", "0")),
+            cancellation_watch_interval=float(env.get("CANCELLATION_WATCH_INTERVAL", "0.25")),
+            api_base_url=env.get("API_BASE_URL", "https://railspaapi.shohoz.com/v1.0/app").rstrip('/'),
+            release_burst_window=float(env.get("RELEASE_BURST_WINDOW", "2.0")),
+            idle_poll_interval=float(env.get("IDLE_POLL_INTERVAL", "5.0")),
+            server_utc_offset=float(env.get("SERVER_UTC_OFFSET", "6")),
+            verify_ssl=_flag(env.get("VERIFY_SSL", "true")),
+            prewarm_connections=int(env.get("PREWARM_CONNECTIONS", "4")),
+            prewarm_lead=float(env.get("PREWARM_LEAD", "10.0")),
+            keepalive_ping_interval=float(env.get("KEEPALIVE_PING_INTERVAL", "5.0")),
+            connection_keepalive=float(env.get("CONNECTION_KEEPALIVE", "60.0")),
+            hedge_requests=int(env.get("HEDGE_REQUESTS", "1")),
+            hedge_stagger=float(env.get("HEDGE_STAGGER_MS", "5")) / 1000,
+            rate_limits=env.get("RATE_LIMITS"),
+            retry_policies=env.get("RETRY_POLICIES"),
+            fast_layout_parse=_flag(env.get("FAST_LAYOUT_PARSE", "true")),
+            use_token_cache=_flag(env.get("USE_TOKEN_CACHE", "true")),
+            token_cache_file=env.get("TOKEN_CACHE_FILE", ".bdrail_token_cache.json"),
+            token_refresh_lead=float(env.get("TOKEN_REFRESH_LEAD", "300")),
+            log_level=env.get("LOG_LEVEL", "INFO"),
+            metrics_json_file=env.get("METRICS_JSON_FILE"),
+            metrics_prometheus_file=env.get("METRICS_PROMETHEUS_FILE"),
+        )
+
+def create_ssl_context(verify_ssl=True):
+    if not verify_ssl:
+        ssl_context = ssl.create_default_context()
+        ssl_context.check_hostname = False
+        ssl_context.verify_mode = ssl.CERT_NONE
+        return ssl_context
+    try:
+        import certifi
+        return ssl.create_default_context(cafile=certifi.where())
+    except ImportError:
+        return ssl.create_default_context()
+
+def create_http_session(config, trace_configs=()):
+    """One connection pool for a whole run (or many sessions), so every step reuses the same keep-alive connections.
+
+    DNS is resolved once and cached; idle connections are kept for `connection_keepalive` seconds.
+    """
+    connector = aiohttp.TCPConnector(limit=max(20, config.prewarm_connections), ssl=create_ssl_context(config.verify_ssl),
+                                     ttl_dns_cache=None, keepalive_timeout=config.connection_keepalive)
+    return aiohttp.ClientSession(connector=connector, trace_configs=list(trace_configs))
+
+def resolve_payment_method(choice):
+    """Accept a method name ("nagad") or its menu number ("2"). Returns the method key or None."""
+    methods = list(PAYMENT_METHODS)
+    if choice in PAYMENT_METHODS:
+        return choice
+    if choice.isdigit() and 1 <= int(choice) <= len(methods):
+        return methods[int(choice) - 1]
+    return None
+
+def collect_booking_details(config):
+    """Fill in whatever PASSENGER_NAMES / PAYMENT_METHOD left out, before any time-critical step starts.
+
+    The passenger lists name the passengers after the account holder, so each holds at most
+    MAX_SELECTABLE_SEAT - 1 entries; a longer list is rejected rather than silently shifted.
+    """
+    extra_passengers = max(config.max_selectable_seat - 1, 0)
+    for name, values in (("PASSENGER_NAMES", config.passenger_names), ("PASSENGER_GENDERS", config.passenger_genders),
+                         ("PASSENGER_TYPES", config.passenger_types)):
+        if len(values) > extra_passengers:
+            raise ValueError(f"{name} lists {len(values)} passengers but only {extra_passengers} travel with the account holder "
+                             f"(MAX_SELECTABLE_SEAT={config.max_selectable_seat}); the account holder's own gender and type "
+                             f"are ACCOUNT_HOLDER_GENDER / ACCOUNT_HOLDER_TYPE")
+
+    for i in range(len(config.passenger_names), extra_passengers):
+        config.passenger_names.append(input(f"{Fore.YELLOW}Enter passenger {i + 2} name: "))
+    config.passenger_genders += ["male"] * (extra_passengers - len(config.passenger_genders))
+    config.passenger_types += ["Adult"] * (extra_passengers - len(config.passenger_types))
+
+    method = resolve_payment_method(config.payment_method)
+    if method is None:
+        if config.payment_method:
+            print(f"{Fore.RED}Unknown PAYMENT_METHOD '{config.payment_method}'.")
+        # Payment method selection prompt
+        print(f"\n{Fore.CYAN}Select Payment Method:")
+        print("\n".join(f"{i}. {label}" for i, (label, _) in enumerate(PAYMENT_METHODS.values(), 1)))
+        while method is None:
+            method = resolve_payment_method(input(f"{Fore.YELLOW}Enter the number corresponding to your payment method: ").strip().lower())
+            if method is None:
+                print(f"{Fore.RED}Invalid selection! Please enter a number between 1 and {len(PAYMENT_METHODS)}.")
+    config.payment_method = method
+    print(f"{Fore.GREEN}Payment Method Selected: {PAYMENT_METHODS[method][0]}")
+
+def serialize_confirm_payload(confirm_payload):
+    """Serialize the payload once, returning the JSON text before and after the OTP value."""
+    prefix, _, suffix = json.dumps({"otp": OTP_PLACEHOLDER, **confirm_payload}).partition(json.dumps(OTP_PLACEHOLDER))
+    return prefix, suffix
+
+class BookingSession:
+    """One account's booking on a shared aiohttp session.
+
+    `http` is the pooled aiohttp.ClientSession; `metrics` and `handshake_timer`
+    should be the objects whose trace configs that session was created with.
+    """
+
+    def __init__(self, config, http, metrics=None, handshake_timer=None, rate_controller=None,
+                 search_cache=None, token_cache=None, otp_receiver=None):
+        self.config = config
+        self.http = http
+        self.metrics = metrics or RunMetrics()
+        self.handshake_timer = handshake_timer or HandshakeTimer()
+        # Adaptive pacing and retry backoff per endpoint
+        self.rate_controller = rate_controller or AdaptiveRateController(parse_budgets(config.rate_limits))
+        # Status handling, bounded retries and a circuit breaker per endpoint
+        self.endpoints = EndpointClient(self.rate_controller, self.reauthenticate, parse_policies(config.retry_policies))
+        self.search_cache = search_cache or SearchCache(config.search_cache_ttl)
+        self.token_cache = token_cache or TokenCache(config.token_cache_file)
+        self.otp_receiver = otp_receiver or build_otp_receiver(config.otp_sources, config.otp_file, config.otp_fifo,
+                                                               config.otp_http_host, config.otp_http_port, config.otp_http_token)
+        self.journal = BookingJournal(config.booking_journal, [config.mobile_number, config.from_city, config.to_city,
+                                                               config.date_of_journey]) if config.booking_journal else None
+        self.trip_preferences = parse_preferences(config.train_preferences, config.train_number, config.seat_class)
+
+        self.auth_key = None
+        self.user = {}                    # email, phone number and display name from the token's claims
+        self.token_from_cache = False     # whether auth_key was reused from the token cache
+        self.headers = {}
+        self.json_headers = {"Content-Type": JSON_CONTENT_TYPE}   # for prebuilt JSON bodies
+        self.auth_lock = asyncio.Lock()   # guards token refreshes
+        self.trip_options = []
+        self.trip = None                  # the TripOption being booked
+        self.ticket_ids = []
+        self.reserved_seats = {}          # ticket id -> seat name
+        self.seat_limit_reached = False   # the server refused any further seat for this order
+        self.confirm_body_parts = None
+
+    # Authentication
+
+    async def fetch_auth_token(self):
+        login_url = f"{self.config.api_base_url}/auth/sign-in"
+        payload = {
+            "mobile_number": self.config.mobile_number,
+            "password": self.config.password
+        }
+
+        # Sign-in is what a 401 falls back to, so its own 401 is final
+        response = await self.endpoints.call("sign-in", lambda: self.http.post(login_url, data=payload), authenticated=False)
+        if response.ok:
+            auth_token = response.json().get("data", {}).get("token")
+            if auth_token:
+                print(f"{Fore.GREEN}Authentication successful!")
+                print(f"{Fore.MAGENTA}Auth Token: {auth_token}")
+                return auth_token
+            print(f"{Fore.RED}Failed to retrieve token from response.")
+        elif not is_retryable(response.status):
+            print(f"{Fore.RED}Error: {response.status} - {response.text()}")
+        return None
+
+    def set_auth_token(self, auth_key, user=None):
+        """Use `auth_key` for every request; `user` is its user info when already known (from the token cache)."""
+        self.auth_key = auth_key
+        if user is None:
+            claims = decode_token(auth_key)
+            user = user_info(claims) if claims else {}
+        self.user = user
+        self.headers['Authorization'] = f'Bearer {auth_key}'
+        self.json_headers['Authorization'] = self.headers['Authorization']
+
+    async def sign_in(self):
+        """Authenticate, reusing a cached, still-valid token if there is one. Returns True on success."""
+        cached_token = self.token_cache.get(self.config.mobile_number) if self.config.use_token_cache else None
+        if cached_token:
+            self.set_auth_token(cached_token["token"], cached_token.get("user"))
+            self.token_from_cache = True
+            print(f"{Fore.GREEN}Using cached auth token (expires {time.strftime('%I:%M:%S %p', time.localtime(cached_token['exp']))}).")
+            return True
+
+        with self.metrics.phase("login"):
+            auth_key = await self.fetch_auth_token()
+        if not auth_key:
+            return False
+        self.set_auth_token(auth_key)
+        if self.config.use_token_cache:
+            self.token_cache.put(self.config.mobile_number, auth_key)
+        return True
+
+    def extract_user_info_from_token(self):
+        """Email, phone number and display name of the signed-in account, or Nones if the token could not be decoded."""
+        if not self.user:
+            print(f"{Fore.RED}Failed to decode auth token.")
+            return None, None, None
+        user_email, user_phone, user_name = self.user["email"], self.user["phone_number"], self.user["display_name"]
+        print(f"{Fore.CYAN}Extracted from token -> Email: {user_email}, Phone: {user_phone}, Name: {user_name}")
+        return user_email, user_phone, user_name
+
+    async def reauthenticate(self):
+        """Swap a fresh token into the headers after a 401 or ahead of expiry."""
+        token_before = self.auth_key
+        async with self.auth_lock:
+            if self.auth_key != token_before:
+                return True  # Another request refreshed the token while we waited
+
+            if self.token_from_cache:
+                # The cached token was rejected or is about to expire: never hand it to the next run
+                self.token_cache.discard(self.config.mobile_number)
+                self.token_from_cache = False
+
+            print(f"{Fore.YELLOW}Re-acquiring auth token...")
+            new_token = await self.fetch_auth_token()
+            if not new_token:
+                print(f"{Fore.RED}Failed to refresh auth token.")
+                return False
+
+            self.set_auth_token(new_token)
+            if self.config.use_token_cache:
+                self.token_cache.put(self.config.mobile_number, new_token)
+            return True
+
+    async def keep_token_fresh(self):
+        """Background task: refresh the token shortly before its exp claim."""
+        while True:
+            expires_at = decode_token(self.auth_key).get("exp")
+            if expires_at is None:
+                return  # Token carries no expiry; nothing to schedule
+            await asyncio.sleep(max(expires_at - time.time() - self.config.token_refresh_lead, 1.0))
+            if decode_token(self.auth_key).get("exp") == expires_at:
+                await self.reauthenticate()
+
+    # Trip search
+
+    async def fetch_trip_details(self, preferences=None):
+        """Search the journey once and return the acceptable trips as TripOptions, best first."""
+        config = self.config
+        preferences = preferences or self.trip_preferences
+        url = f"{config.api_base_url}/bookings/search-trips-v2"
+        payload = {
+            "from_city": config.from_city,
+            "to_city": config.to_city,
+            "date_of_journey": config.date_of_journey,
+            "seat_class": preferences[0][1]
+        }
+        cache_key = (config.from_city, config.to_city, config.date_of_journey, preferences[0][1])
+
+        def found(trip_options):
+            for option in trip_options:
+                print(f"{Fore.GREEN}Trip details found! #{option.rank + 1} Train: {option.train_name}, Class: {option.seat_class}, Trip ID: {option.trip_id}, Route ID: {option.trip_route_id}, Boarding Point ID: {option.boarding_point_id}")
+            return trip_options
+
+        print(f"{Fore.YELLOW}Fetching trip details for {config.from_city} to {config.to_city} on {config.date_of_journey}...")
+
+        search_started = time.monotonic()   # waiting for trips to be listed is bounded by the search deadline
+        last_seen = None                    # a retry needs a search newer than the one already resolved
+        while True:
+            # A recent search for the same route, possibly by another session on this cache, answers without a round-trip
+            async with self.search_cache.lock(cache_key):
+                entry = self.search_cache.get(cache_key, last_seen)
+                if entry is None:
+                    response = await self.endpoints.call("search-trips-v2", lambda: self.http.get(url, headers=self.headers, params=payload))
+                    if response.ok:
+                        data = response.json().get("data", {}).get("trains", [])
+                        # Index the response once; every preference of every session resolves against it
+                        entry = self.search_cache.put(cache_key, index_trains(data)) if data else None
+                    elif response.status == 401 or is_retryable(response.status):
+                        return []  # re-authentication failed or the retries ran out
+                    else:
+                        # Bad city, date or class: asking again will not change the answer
+                        print(f"{Fore.RED}Failed to fetch trip details. HTTP Status: {response.status}")
+                        print(f"{Fore.CYAN}Server response: {response.text()}")
+                        raise BookingAborted(f"trip search rejected (HTTP {response.status})")
+
+            if entry is None:
+                print(f"{Fore.YELLOW}Trip details not available yet. Retrying...")
+            else:
+                last_seen, trains_index = entry
+                trip_options = resolve_trips(trains_index, preferences)
+                if trip_options:
+                    return found(trip_options)
+                wanted = ", ".join(f"{train} ({train_class})" for train, train_class in preferences)
+                print(f"{Fore.YELLOW}None of the preferred trains [{wanted}] available yet. Retrying...")
+
+            if not await self.rate_controller.backoff("search-trips-v2", search_started):
+                print(f"{Fore.RED}No matching trips listed before the search deadline.")
+                return []
+
+    # Polling for the open instant
+
+    async def is_booking_available(self, trip, label=""):
+        """Poll the trip's seat layout until booking opens and return the layout, or None."""
+        config = self.config
+        rate_controller = self.rate_controller
+        # The same request is sent thousands of times; URL and body are built once
+        request = RequestTemplate("GET", f"{config.api_base_url}/bookings/seat-layout",
+                                  {"trip_id": trip.trip_id, "trip_route_id": trip.trip_route_id})
+
+        scheduler = ReleaseScheduler(config.release_burst_window, config.idle_poll_interval, config.server_utc_offset)
+        warmer = ConnectionWarmer(self.http, config.api_base_url, config.prewarm_connections,
+                                  config.keepalive_ping_interval, self.handshake_timer)
+
+        async def fetch_seat_layout():
+            request_start = time.perf_counter()
+            send_time = time.time()
+            async with request.send(self.http, self.json_headers) as response:
+                body = await response.read()
+                return (response.status, body, response.headers.get("Date"), send_time, time.time(), request_start,
+                        response.headers.get("Retry-After"))
+
+        # Up to `width` staggered requests in flight; 1 while idling before release, hedge_requests in the burst
+        poller = HedgedPoller(fetch_seat_layout, config.hedge_stagger)
+        width = config.hedge_requests
+
+        wait_start = time.perf_counter()
+        # Keys for folding repeated poller lines into counters
+        not_open_key = f"{label}seat-layout 422 not-open"
+        overloaded_key = f"{label}seat-layout 5xx backoff"
+        error_key_name = f"{label}seat-layout connection error"
+        try:
+            while True:
+                start_time = time.perf_counter()
+                try:
+                    status, body, date_header, send_time, recv_time, request_start, retry_after = await poller.next_response(width)
+                    end_time = time.perf_counter()
+                    elapsed = end_time - start_time
+                    scheduler.observe_response(date_header, send_time, recv_time)
+                    rate_controller.record("seat-layout", status, recv_time - send_time, parse_retry_after(retry_after))
+
+                    if status == 200:
+                        # Only the seat fields are decoded, and bodies without seatLayout are not parsed at all
+                        seat_layout = parse_seat_layout(body, config.fast_layout_parse)
+
+                        # If seatLayout is available, return immediately
+                        if seat_layout is not None:
+                            self.metrics.record_phase("wait-for-open", wait_start, request_start, label=trip.train_name)
+                            self.metrics.record_phase("layout-fetch", request_start, label=trip.train_name)
+                            log.info(f"{Fore.GREEN}%sBooking is now available!", label)
+                            scheduler.record_success()
+                            warmer.stop()
+                            poller.cancel_all()
+                            for line in scheduler.report() + warmer.report() + poller.report() + rate_controller.report():
+                                log.info(f"{Fore.CYAN}%s", line)
+                            log.info(f"{Fore.CYAN}Seat layout decoded with %s", DECODER if config.fast_layout_parse else 'json')
+                            return seat_layout
+
+                    elif is_retryable(status):
+                        log.warning(f"{Fore.YELLOW}Server overloaded (HTTP %s). Backing off...", status, extra={"collapse": overloaded_key})
+                    elif status == 401:
+                        if not await self.reauthenticate():
+                            return None
+                    elif status == 422:
+                        error = ApiError.parse(body)
+                        error_message, error_key = error.message, error.key
+
+                        # Print the server response
+                        if log.isEnabledFor(logging.DEBUG):  # skip decoding the body unless it is printed
+                            log.debug(f"{Fore.CYAN}Server response: %s", body.decode(errors='replace'), extra={"collapse": f"{not_open_key} response"})
+
+                        # Retry ONLY if the message says when ticket purchase for this trip will be available
+                        if error.matches(NOT_OPEN):
+                            log.info(f"{Fore.YELLOW}%sBooking is not open yet: %s. Retrying until available...", label, error_message, extra={"collapse": not_open_key})
+                            scheduler.observe_not_open(error_message)
+                            # Open and keep the connection pool hot shortly before release
+                            until_open = scheduler.seconds_until_open()
+                            if until_open is None or until_open <= config.prewarm_lead:
+                                warmer.start()
+                            # Idle cheaply while booking is far away, then retry at the adaptive interval near the open instant
+                            idle_delay = scheduler.idle_delay()
+                            width = config.hedge_requests if idle_delay == 0 else 1
+                            if idle_delay > 0:
+                                log.info(f"{Fore.YELLOW}%sBooking opens in %.1fs (clock offset %+.0f ms). Next check in %.1fs...", label, scheduler.seconds_until_open(), scheduler.clock.offset * 1000, idle_delay)
+                            await asyncio.sleep(max(idle_delay, rate_controller.interval("seat-layout")))
+                            continue  # Go back to the loop
+
+                        # If errorKey indicates OrderLimitExceeded, show a short message.
+                        if error_key == "OrderLimitExceeded":
+                            log.error(f"{Fore.RED}Error: You have reached the maximum ticket booking limit for {config.from_city} to {config.to_city} on {config.date_of_journey} for {trip.train_name}. Please try booking again on a different day, or consider changing the train number, origin station, or destination.")
+                        else:
+                            # For other messages like ongoing purchase process or multiple order attempts,
+                            # attempt to extract the wait time from the message and calculate the retry time.
+                            time_match = RETRY_AFTER.search(error_message)
+                            if time_match:
+                                minutes = int(time_match.group(1))
+                                seconds = int(time_match.group(2))
+                                total_seconds = minutes * 60 + seconds
+                                current_time_formatted = time.strftime('%I:%M:%S %p', time.localtime())
+                                future_time_formatted = time.strftime('%I:%M:%S %p', time.localtime(time.time() + total_seconds))
+                                log.error(f"{Fore.RED}Error: {error_message} Current system time is {current_time_formatted}. Please try again after {future_time_formatted}.")
+                            else:
+                                log.warning(f"{Fore.YELLOW}%s Please try again later.", error_message)
+
+                        # Stop further processing in these cases.
+                        raise BookingAborted(error_key or error_message)
+                    else:
+                        # Some other status code
+                        log.error(f"{Fore.RED}Failed to fetch seat layout. HTTP Status: %s", status)
+                        if log.isEnabledFor(logging.DEBUG):
+                            log.debug(f"{Fore.CYAN}Server response: %s", body.decode(errors='replace'))
+
+                except aiohttp.ClientError as e:
+                    end_time = time.perf_counter()
+                    elapsed = end_time - start_time
+                    rate_controller.record("seat-layout")
+                    log.warning(f"{Fore.RED}An error occurred while checking booking availability: %s", e, extra={"collapse": error_key_name})
+
+                # Enforce the adaptive minimum gap between loop starts (1 ms when the server is healthy)
+                loop_interval = rate_controller.interval("seat-layout")
+                if elapsed < loop_interval:
+                    await asyncio.sleep(loop_interval - elapsed)
+        finally:
+            # Also runs when a parallel poller is cancelled because another trip won
+            poller.cancel_all()
+            warmer.stop()
+
+    # Seat selection
+
+    def get_ticket_ids_from_layout(self, seat_layout):
+        # Parse the layout once into an index; selection then works on flat arrays and lookups.
+        # The preferred seats come first, followed by spare candidates used to refill failed reservations.
+        max_selectable_seat = self.config.max_selectable_seat
+        selected_seat_details = rank_seats(SeatIndex(seat_layout), self.config.desired_seats, max_selectable_seat,
+                                           max_selectable_seat + self.config.reserve_spare_candidates)
+
+        if len(selected_seat_details) >= max_selectable_seat:
+            return selected_seat_details
+
+        # Return the seats found even if they are fewer than max_selectable_seat
+        if selected_seat_details:
+            log.warning(f"{Fore.YELLOW}Warning: Proceeding with %d seats instead of %d.", len(selected_seat_details), max_selectable_seat)
+            return selected_seat_details
+
+        log.error(f"{Fore.RED}No seats available to proceed.")
+        return None
+
+    async def watch_trip(self, trip, label=""):
+        """Poll one trip until its layout opens. Returns (trip, ticket_id_map), or None if it opened without suitable seats."""
+        seat_layout = await self.is_booking_available(trip, label)
+        if not seat_layout:
+            log.error(f"{Fore.RED}%sSeat layout could not be retrieved.", label)
+            return None
+        with self.metrics.phase("seat-selection", trip.train_name):
+            ticket_id_map = self.get_ticket_ids_from_layout(seat_layout)
+        if not ticket_id_map:
+            log.error(f"{Fore.RED}%sNo matching seats found based on desired preferences.", label)
+            return None
+        return trip, ticket_id_map
+
+    async def first_open_trip(self, trips):
+        """Poll all `trips` concurrently on the shared session. The first one whose layout opens with
+        suitable seats wins; the other pollers are cancelled straight away. Returns None if none did.
+
+        A trip whose poller aborts (e.g. an order limit on that train) is dropped and the others keep
+        polling; BookingAborted is only raised when every trip aborted.
+        """
+        if len(trips) == 1:
+            return await self.watch_trip(trips[0])
+
+        log.info(f"{Fore.YELLOW}Polling {len(trips)} trips in parallel: {', '.join(f'{trip.train_name} ({trip.seat_class})' for trip in trips)}")
+        tasks = {asyncio.ensure_future(self.watch_trip(trip, f"[{trip.train_name} {trip.seat_class}] ")): trip for trip in trips}
+        pending = set(tasks)
+        aborted = []
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                results = []
+                for task in done:
+                    try:
+                        result = task.result()
+                    except BookingAborted as e:
+                        trip = tasks[task]
+                        log.warning(f"{Fore.YELLOW}Dropping %s (%s): %s", trip.train_name, trip.seat_class, e)
+                        aborted.append(e)
+                        continue
+                    if result:
+                        results.append(result)
+                # If several trips opened in the same instant, prefer the better-ranked one
+                if results:
+                    return min(results, key=lambda result: result[0].rank)
+            if len(aborted) == len(tasks):
+                raise aborted[-1]
+            return None
+        finally:
+            for task in pending:
+                task.cancel()
+
+    # Reservation
+
+    async def reserve_ticket(self, ticket, seat_number, route_id):
+        """Reserve one seat, retrying overloads and expired tokens. Returns True once the server acks it.
+
+        Sets `seat_limit_reached` when the server refuses any further seat for this order.
+        """
+        if self.seat_limit_reached:
+            return False  # Stop further reservation attempts if limit error occurred
+
+        # Retries resend the same prebuilt request
+        request = RequestTemplate("PATCH", f"{self.config.api_base_url}/bookings/reserve-seat",
+                                  {"ticket_id": ticket, "route_id": route_id})
+
+        with self.metrics.phase("reserve-seat", seat_number):
+            response = await self.endpoints.call("reserve-seat", lambda: request.send(self.http, self.json_headers))
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug(f"{Fore.CYAN}Response from Reserve Seat API for Seat %s (Ticket ID: %s): %s", seat_number, ticket, response.text())
+
+        if response.ok:
+            data = response.json()
+            if data["data"].get("ack") == 1:  # Success is indicated by "ack": 1
+                log.info(f"{Fore.GREEN}Seat %s (Ticket ID: %s) reserved successfully!", seat_number, ticket)
+                return True
+            log.error(f"{Fore.RED}Failed to reserve seat %s (Ticket ID: %s): %s", seat_number, ticket, data)
+        elif response.error.matches(SEAT_LIMIT):
+            log.error(f"{Fore.RED}Error: %s. Stopping further seat reservation.", response.error.message)
+            self.seat_limit_reached = True  # Stop attempting further reservations
+        elif response.error.matches(SEAT_TAKEN):
+            log.warning(f"{Fore.RED}Seat %s (Ticket ID: %s) is not available now. Skipping retry.", seat_number, ticket)
+        elif response.status is not None and not is_retryable(response.status) and response.status != 401:
+            log.error(f"{Fore.RED}Error: %s - %s", response.status, response.text())
+        else:
+            log.error(f"{Fore.RED}Giving up on seat %s (Ticket ID: %s).", seat_number, ticket)
+        return False
+
+    async def reserve_candidates(self, candidates, target_seats, route_id):
+        """Reserve up to `target_seats` of `candidates` [(ticket_id, seat_number)], best first. Returns the reserved ticket ids.
+
+        One lane per wanted seat. A lane whose seat fails takes the next candidate at once; lanes
+        stop when reserved plus in-flight seats cover the target, so the seat limit is never overshot.
+        """
+        reserved = []
+        pending = iter(candidates)
+        in_flight = 0
+
+        async def reservation_lane():
+            nonlocal in_flight
+            while len(reserved) + in_flight < target_seats and not self.seat_limit_reached:
+                candidate = next(pending, None)
+                if candidate is None:
+                    return
+                in_flight += 1
+                try:
+                    if await self.reserve_ticket(*candidate, route_id):
+                        reserved.append(candidate[0])
+                finally:
+                    in_flight -= 1
+
+        await asyncio.gather(*(reservation_lane() for _ in range(min(target_seats, len(candidates)))))
+        return reserved
+
+    async def reserve_seat(self):
+        """Wait for the first trip to open and reserve its seats concurrently. Returns True if any seat was reserved."""
+        config = self.config
+        self.seat_limit_reached = False
+        log.info(f"{Fore.YELLOW}Waiting for seat layout availability...")
+
+        # Check for seat layout availability, on the top PARALLEL_TRIPS trips at once
+        winner = await self.first_open_trip(self.trip_options[:max(1, config.parallel_trips)])
+        if not winner:
+            log.error(f"{Fore.RED}No trip opened with suitable seats. Exiting.")
+            return False
+
+        # The rest of the booking continues on whichever trip won
+        trip, ticket_id_map = winner
+        self.trip = trip
+        if len(self.trip_options) > 1:
+            log.info(f"{Fore.GREEN}Booking on %s (%s).", trip.train_name, trip.seat_class)
+
+        # Prepare ticket_ids list (preferred seats first, then spares) and seat mapping for display
+        ticket_ids = list(ticket_id_map.keys())
+        target_seats = min(config.max_selectable_seat, SERVER_SEAT_LIMIT, len(ticket_ids))
+        log.info(f"{Fore.GREEN}Seats matched! Details: {', '.join([f'{ticket_id_map[ticket]} (Ticket_ID: {ticket})' for ticket in ticket_ids[:target_seats]])}")
+        if len(ticket_ids) > target_seats:
+            log.info(f"{Fore.CYAN}{len(ticket_ids) - target_seats} spare seats ranked to refill any failed reservation.")
+
+        log.info(f"{Fore.YELLOW}Initiating seat reservation process for %d tickets...", target_seats)
+
+        # All reservations share the session's keep-alive connections that were warmed up by polling
+        connections_before = self.handshake_timer.snapshot()
+        successful_ticket_ids = await self.reserve_candidates(list(ticket_id_map.items()), target_seats, trip.trip_route_id)
+        log.info(f"{Fore.CYAN}Reservation used %s", self.handshake_timer.summary(connections_before))
+
+        if successful_ticket_ids:
+            self.ticket_ids = successful_ticket_ids  # Update with successful ones
+            self.reserved_seats = {ticket: ticket_id_map[ticket] for ticket in successful_ticket_ids}
+            if len(successful_ticket_ids) < target_seats:
+                log.warning(f"{Fore.YELLOW}Reserved %d of %d seats; ranked candidates ran out.", len(successful_ticket_ids), target_seats)
+            log.info(f"{Fore.GREEN}Successfully reserved tickets: %s. Proceeding to next step...", successful_ticket_ids)
+            return True
+        else:
+            log.error(f"{Fore.RED}No seats could be reserved. Please try again.")
+            return False
+
+    async def watch_for_cancellations(self, duration):
+        """Keep polling the trip's seat layout after open and reserve wanted seats the moment they are freed
+        (by cancellations or expired holds), until enough seats are held or `duration` seconds pass.
+        Returns True if any seat is held."""
+        config = self.config
+        trip = self.trip
+        target_seats = min(config.max_selectable_seat, SERVER_SEAT_LIMIT)
+        request = RequestTemplate("GET", f"{config.api_base_url}/bookings/seat-layout",
+                                  {"trip_id": trip.trip_id, "trip_route_id": trip.trip_route_id})
+        # Only the desired seats when DESIRED_SEATS is set, otherwise any seat
+        diff = AvailabilityDiff(config.desired_seats)
+        deadline = time.monotonic() + duration
+        log.info(f"{Fore.YELLOW}Watching %s (%s) for cancellations for up to %.0fs (%d of %d seats held)...",
+                 trip.train_name, trip.seat_class, duration, len(self.ticket_ids), target_seats)
+
+        with self.metrics.phase("cancellation-watch", trip.train_name):
+            while len(self.ticket_ids) < target_seats and not self.seat_limit_reached and time.monotonic() < deadline:
+                start_time = time.perf_counter()
+                try:
+                    async with request.send(self.http, self.json_headers) as response:
+                        status = response.status
+                        body = await response.read()
+                        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                    self.rate_controller.record("seat-layout", status, time.perf_counter() - start_time, retry_after)
+
+                    if status == 200:
+                        seat_layout = parse_seat_layout(body, config.fast_layout_parse)
+                        freed = diff.update(seat_layout) if seat_layout is not None else []
+                        if freed:
+                            log.info(f"{Fore.GREEN}Seats freed: %s. Reserving...", ", ".join(seat_number for _, seat_number in freed))
+                            seat_numbers = dict(freed)
+                            reserved = await self.reserve_candidates(freed, target_seats - len(self.ticket_ids), trip.trip_route_id)
+                            for ticket in reserved:
+                                self.ticket_ids.append(ticket)
+                                self.reserved_seats[ticket] = seat_numbers[ticket]
+                            if reserved:
+                                self.journal_reservation()  # a crash later in the watch can still resume with these seats
+
+                    elif status == 401:
+                        if not await self.reauthenticate():
+                            break
+                    elif is_retryable(status):
+                        log.warning(f"{Fore.YELLOW}Server overloaded (HTTP %s). Backing off...", status, extra={"collapse": "cancellation watch 5xx backoff"})
+                    else:
+                        log.error(f"{Fore.RED}Failed to fetch seat layout. HTTP Status: %s", status, extra={"collapse": f"cancellation watch {status}"})
+                        if log.isEnabledFor(logging.DEBUG):
+                            log.debug(f"{Fore.CYAN}Server response: %s", body.decode(errors='replace'))
+
+                except aiohttp.ClientError as e:
+                    self.rate_controller.record("seat-layout")
+                    log.warning(f"{Fore.RED}An error occurred while watching for cancellations: %s", e, extra={"collapse": "cancellation watch connection error"})
+
+                # Snapshots are spaced by the watch interval; a freed seat is reserved as soon as a snapshot shows it
+                elapsed = time.perf_counter() - start_time
+                loop_interval = max(config.cancellation_watch_interval, self.rate_controller.interval("seat-layout"))
+                if elapsed < loop_interval:
+                    await asyncio.sleep(loop_interval - elapsed)
+
+        for line in diff.report():
+            log.info(f"{Fore.CYAN}%s", line)
+        if self.ticket_ids:
+            log.info(f"{Fore.GREEN}Holding %d of %d seats: %s.", len(self.ticket_ids), target_seats,
+                     ", ".join(self.reserved_seats[ticket] for ticket in self.ticket_ids))
+        else:
+            log.error(f"{Fore.RED}No seats were freed in time.")
+        return bool(self.ticket_ids)
+
+    # Passenger details, OTP and confirm
+
+    async def send_passenger_details(self):
+        """Send the passenger details for the reserved tickets, which makes the server send the OTP."""
+        url = f"{self.config.api_base_url}/bookings/passenger-details"
+        payload = {
+            "trip_id": self.trip.trip_id,
+            "trip_route_id": self.trip.trip_route_id,
+            "ticket_ids": self.ticket_ids
+        }
+
+        response = await self.endpoints.call("passenger-details", lambda: self.http.post(url, headers=self.headers, json=payload))
+        print(f"{Fore.CYAN}Response from Passenger Details API: {response.text()}")
+
+        if response.ok:
+            data = response.json()
+            if data["data"]["success"]:
+                print(f"{Fore.GREEN}OIP sent successfully!")
+                return True
+            print(f"{Fore.RED}Failed to send OIP: {data}]")
+        elif not is_retryable(response.status):
+            print(f"{Fore.RED}Error: {response.status} - {response.text()}]")
+        return False
+
+    async def verify_otp(self, otp):
+        """Verify the OTP. Returns the OTP that was accepted (it may have been re-entered), or False."""
+        verify_url = f"{self.config.api_base_url}/bookings/verify-otp"
+        verify_payload = {
+            "trip_id": self.trip.trip_id,
+            "trip_route_id": self.trip.trip_route_id,
+            "ticket_ids": self.ticket_ids,
+            "otp": otp
+        }
+
+        with self.metrics.phase("otp-verify"):
+            while True:
+                response = await self.endpoints.call("verify-otp", lambda: self.http.post(verify_url, headers=self.headers, json=verify_payload))
+                print(f"{Fore.CYAN}Response from OTP Verification API: {response.text()}")
+
+                if response.ok:
+                    data = response.json()
+                    if not data["data"]["success"]:
+                        print(f"{Fore.RED}Failed to verify OTP: {data}")
+                        return False
+                    print(f"{Fore.GREEN}OTP verified successfully!")
+                    return otp
+
+                if response.status == 401 or is_retryable(response.status):
+                    return False  # re-authentication failed or the retries ran out
+
+                print(f"{Fore.RED}Error: {response.status} - {response.error}")
+                if response.status != 422 or response.error.key != "OtpNotVerified":
+                    return False
+                try:
+                    otp, source = await self.otp_receiver.receive(f"{Fore.YELLOW}The OTP does not match. Please enter the correct OTP: ")
+                except OtpSourceClosed as e:
+                    print(f"{Fore.RED}Cannot read another OTP: {e}.")
+                    return False
+                print(f"{Fore.CYAN}OTP received from {source}.")
+                verify_payload["otp"] = otp
+
+    def prepare_confirm_payload(self):
+        """Build the confirm payload for the reserved tickets, everything except the OTP."""
+        config = self.config
+        user_email, user_phone, user_name = self.extract_user_info_from_token()
+        count = len(self.ticket_ids)
+
+        confirm_payload = {
+            "is_bkash_online": True,
+            "boarding_point_id": self.trip.boarding_point_id,
+            "from_city": config.from_city,
+            "to_city": config.to_city,
+            "date_of_journey": config.date_of_journey,
+            "seat_class": self.trip.seat_class,
+            # The account holder first, then the configured passengers (see collect_booking_details)
+            "passengerType": ([config.account_holder_type] + config.passenger_types + ["Adult"] * count)[:count],
+            "gender": ([config.account_holder_gender] + config.passenger_genders + ["male"] * count)[:count],
+            "pname": [user_name] + config.passenger_names[:count - 1],
+            "pmobile": user_phone,
+            "pemail": user_email,
+            "trip_id": self.trip.trip_id,
+            "trip_route_id": self.trip.trip_route_id,
+            "ticket_ids": self.ticket_ids,
+            "contactperson": 0 if count > 1 else 8,
+            "selected_mobile_transaction": 1
+        }
+
+        for key, value in PAYMENT_METHODS[config.payment_method][1].items():
+            if value is None:
+                confirm_payload.pop(key, None)
+            else:
+                confirm_payload[key] = value
+        return confirm_payload
+
+    async def confirm_booking(self, otp):
+        """Confirm the booking with the verified OTP and print the payment link. Returns True on success."""
+        confirm_url = f"{self.config.api_base_url}/bookings/confirm"
+
+        # The payload was built and serialized before the OTP was requested; only the OTP is spliced in
+        if self.confirm_body_parts is None:
+            self.confirm_body_parts = serialize_confirm_payload(self.prepare_confirm_payload())
+        confirm_body = json.dumps(otp).join(self.confirm_body_parts)
+        log.debug(f"{Fore.CYAN}Confirm payload: %s", confirm_body)
+        request = RequestTemplate("PATCH", confirm_url, body=confirm_body.encode())
+
+        with self.metrics.phase("confirm"):
+            response = await self.endpoints.call("confirm", lambda: request.send(self.http, self.json_headers))
+        print(f"{Fore.CYAN}Response from Confirm Booking API: {response.text()}")
+
+        if response.ok:
+            data = response.json()
+            if "redirectUrl" in data["data"]:
+                redirect_url = data["data"]["redirectUrl"]
+                print(f"\n{Fore.GREEN}{'='*50}")
+                print(f"{Fore.GREEN}Booking confirmed successfully!")
+                print(f"{Fore.YELLOW}IMPORTANT: Please note that this payment link can be used ONLY ONCE.")
+                print(f"{Fore.BLUE}Payment URL: {redirect_url}")
+                print(f"{Fore.GREEN}{'='*50}\n")
+                return True # Ensure successful return
+            print(f"{Fore.RED}Failed to confirm booking: {data}")
+        elif response.status is None:
+            print(f"{Fore.RED}The confirm request got no answer. Check the account's bookings before retrying.")
+        elif not is_retryable(response.status) and response.status != 401:
+            print(f"{Fore.RED}Error: {response.status} - {response.text()}")
+        return False
+
+    # The whole flow
+
+    def journal_step(self, step, **data):
+        if self.journal:
+            self.journal.record(step, **data)
+
+    def journal_reservation(self):
+        """Journal the seats held so far. Each new entry supersedes the previous one on resume."""
+        trip_fields = self.trip._asdict()
+        del trip_fields["rank"]
+        self.journal_step("reserved", ticket_ids=list(self.ticket_ids), trip=trip_fields,
+                          seats=[self.reserved_seats[ticket] for ticket in self.ticket_ids])
+
+    def restore_booking(self, state):
+        """Put the trip and tickets back the way they were when the journaled steps completed."""
+        self.trip = TripOption(0, **state["trip"])
+        self.ticket_ids = state["ticket_ids"]
+        self.reserved_seats = dict(zip(state["ticket_ids"], state["seats"]))
+
+    async def run_booking_steps(self):
+        """Search, reserve, request and verify the OTP, and confirm, resuming from the journal. Returns True if confirmed."""
+        config = self.config
+        resumed = self.journal.resume(config.reservation_hold) if self.journal else None
+        if resumed:
+            # Seats are still held from the previous run: skip search and polling altogether
+            self.restore_booking(resumed)
+            step = resumed["step"]
+            if step == "confirm-failed":
+                step = "reserved"  # the server refused that OTP's confirm; request a new one
+            elif step in ("otp-requested", "otp-verified") and time.time() - resumed["otp_requested_at"] > config.otp_validity:
+                step = "reserved"  # that OTP has likely expired; request a new one
+            held_for = time.time() - resumed["reserved_at"]
+            print(f"{Fore.GREEN}Resuming booking on {self.trip.train_name} ({self.trip.seat_class}) after '{resumed['step']}': seats {', '.join(resumed['seats'])} reserved {held_for:.0f}s ago.")
+        else:
+            if self.journal:
+                self.journal.begin()
+
+            # Retrieve trip details for the selected journey
+            with self.metrics.phase("trip-search"):
+                self.trip_options = await self.fetch_trip_details()
+
+            # Ensure the retrieved trip details are valid
+            if not self.trip_options or not self.trip_options[0].boarding_point_id:
+                print(f"{Fore.RED}Error: Could not fetch trip details. Please check your inputs.")
+                raise BookingAborted("no trip details")
+
+            # Start from the highest-ranked match; with PARALLEL_TRIPS the booking moves to whichever trip opens first
+            self.trip = self.trip_options[0]
+
+            # Attempt to reserve selected seats
+            reserved = await self.reserve_seat()
+            if reserved:
+                self.journal_reservation()
+            # Seats short of the target may still be freed later by cancellations or expired holds
+            if (config.cancellation_watch > 0 and not self.seat_limit_reached
+                    and len(self.ticket_ids) < min(config.max_selectable_seat, SERVER_SEAT_LIMIT)):
+                reserved = await self.watch_for_cancellations(config.cancellation_watch)
+            console_log.flush()  # the poller and reservation loops log through a queue
+            if not reserved:
+                print(f"{Fore.RED}Failed to reserve the seat.")
+                return False
+            step = "reserved"
+
+        # The confirm request is ready before the OTP is even requested
+        self.confirm_body_parts = serialize_confirm_payload(self.prepare_confirm_payload())
+
+        if step == "reserved":
+            # Send passenger details and request OTP for confirmation
+            self.otp_receiver.arm()  # only accept OTPs that arrive from here on
+            with self.metrics.phase("passenger-details"):
+                details_sent = await self.send_passenger_details()
+            if not details_sent:
+                print(f"{Fore.RED}Failed to send passenger details and get OTP.")
+                return False
+            self.journal_step("otp-requested")
+            step = "otp-requested"
+
+        if step == "otp-requested":
+            print(f"{Fore.CYAN}Proceeding to OTP verification and confirmation...")
+
+            # Verify OTP and confirm the booking
+            try:
+                with self.metrics.phase("otp-wait"):
+                    otp, source = await self.otp_receiver.receive(f"{Fore.YELLOW}Enter the OTP received: ")
+            except OtpSourceClosed as e:
+                print(f"{Fore.RED}Cannot read the OTP: {e}.")
+                return False
+            print(f"{Fore.CYAN}OTP received from {source}.")
+            otp = await self.verify_otp(otp)
+            if not otp:
+                print(f"{Fore.RED}Failed to complete booking process.")
+                return False
+            self.journal_step("otp-verified", otp=otp)
+        else:
+            otp = resumed["otp"]
+
+        if await self.confirm_booking(otp):
+            self.journal_step("confirmed")
+            print(f"{Fore.GREEN}Booking process completed successfully!")
+            return True
+        self.journal_step("confirm-failed")  # a restart requests a fresh OTP instead of resending this one
+        print(f"{Fore.RED}Failed to complete booking process.")
+        return False
+
+    async def run(self, start_at=None):
+        """Sign in and run the booking end to end. Returns True if confirmed; raises BookingAborted if it cannot start.
+
+        With `start_at` (a time.time() value) the session signs in straight away but
+        only starts searching and polling at that instant.
+        """
+        # OTP listeners (file, named pipe, HTTP) are up long before the OTP is sent
+        await self.otp_receiver.start()
+        token_refresher = None
+        try:
+            if not await self.sign_in():
+                print(f"{Fore.RED}Failed to fetch auth token. Exiting...")
+                raise BookingAborted("sign-in failed")
+            token_refresher = asyncio.create_task(self.keep_token_fresh())
+            if start_at is not None:
+                await asyncio.sleep(max(start_at - time.time(), 0))
+            return await self.run_booking_steps()
+        finally:
+            for line in self.endpoints.report():
+                log.warning(f"{Fore.YELLOW}%s", line)
+            if self.journal:
+                self.journal.close()
+            if token_refresher:
+                token_refresher.cancel()
+            await self.otp_receiver.stop()
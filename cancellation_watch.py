@@ -0,0 +1,52 @@
+"""Incremental seat-layout diffing for watching cancellations after booking opens.
+
+Each snapshot is reduced to an availability bitmap, one bit per seat in layout
+order (see seat_index.availability_flags). Seats freed since the previous
+snapshot are then `current & ~previous & wanted`: a few big-int operations
+however large the layout, with only the set bits mapped back to tickets. The
+per-seat ticket list is built once and rebuilt only when the layout changes
+shape.
+"""
+from seat_index import availability_flags, flags_to_bitmap
+
+class AvailabilityDiff:
+    def __init__(self, wanted_seat_numbers=None):
+        self.wanted_seat_numbers = set(wanted_seat_numbers) if wanted_seat_numbers else None   # None: any seat
+        self.seats = None    # (ticket_id, seat_number) for each bit
+        self.wanted = 0      # bitmap of the seats worth reserving
+        self.previous = 0    # bitmap of the previous snapshot
+        self.snapshots = 0
+        self.changes = 0     # snapshots in which a wanted seat was freed
+
+    def _learn_layout(self, seat_layout):
+        self.seats = [(seat['ticket_id'], seat['seat_number']) for coach in seat_layout for row in coach['layout'] for seat in row]
+        if self.wanted_seat_numbers is None:
+            self.wanted = (1 << len(self.seats)) - 1
+        else:
+            self.wanted = sum(1 << i for i, (_, seat_number) in enumerate(self.seats) if seat_number in self.wanted_seat_numbers)
+        self.previous = 0
+
+    def update(self, seat_layout):
+        """Wanted seats that became available since the previous snapshot, as [(ticket_id, seat_number)] in layout order.
+
+        The first snapshot reports every wanted seat that is available.
+        """
+        flags = availability_flags(seat_layout)
+        if self.seats is None or len(flags) != len(self.seats):
+            self._learn_layout(seat_layout)
+        current = flags_to_bitmap(flags)
+        freed = current & ~self.previous & self.wanted
+        self.previous = current
+        self.snapshots += 1
+
+        seats = []
+        while freed:
+            lowest = freed & -freed
+            seats.append(self.seats[lowest.bit_length() - 1])
+            freed ^= lowest
+        if seats:
+            self.changes += 1
+        return seats
+
+    def report(self):
+        return [f"Cancellation watch: {self.snapshots} snapshots, {self.changes} with newly freed seats"]
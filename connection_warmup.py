@@ -0,0 +1,127 @@
+"""Connection pre-warming for the booking session.
+
+Shortly before booking opens we resolve DNS once, open a pool of TLS
+connections and keep them alive with periodic pings, so the first layout and
+reserve requests after the open instant ride on already-established sockets.
+The pings are unauthenticated HEAD requests to the API base URL: the server
+rejects them cheaply (404 or 401), and any answer keeps the socket alive.
+They are tagged so that run metrics leave them out, and the warmer counts
+their statuses itself. Handshake timings are collected through an aiohttp
+TraceConfig.
+"""
+import asyncio, time
+import aiohttp
+
+# trace_request_ctx of warm-up pings; RunMetrics skips requests carrying it
+WARMUP_TRACE = {"warmup": True}
+
+class HandshakeTimer:
+    """Collect DNS, connection-setup (TCP+TLS) and reuse statistics for a ClientSession."""
+
+    def __init__(self):
+        self.dns_ms = []
+        self.handshake_ms = []     # one entry per newly created connection
+        self.reused = 0
+        self.dns_cache_hits = 0
+
+    def trace_config(self):
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_dns_resolvehost_start.append(self._on_dns_start)
+        trace_config.on_dns_resolvehost_end.append(self._on_dns_end)
+        trace_config.on_dns_cache_hit.append(self._on_dns_cache_hit)
+        trace_config.on_connection_create_start.append(self._on_create_start)
+        trace_config.on_connection_create_end.append(self._on_create_end)
+        trace_config.on_connection_reuseconn.append(self._on_reuse)
+        return trace_config
+
+    async def _on_dns_start(self, session, ctx, params):
+        ctx.dns_start = time.perf_counter()
+
+    async def _on_dns_end(self, session, ctx, params):
+        self.dns_ms.append((time.perf_counter() - ctx.dns_start) * 1000)
+
+    async def _on_dns_cache_hit(self, session, ctx, params):
+        self.dns_cache_hits += 1
+
+    async def _on_create_start(self, session, ctx, params):
+        ctx.connect_start = time.perf_counter()
+
+    async def _on_create_end(self, session, ctx, params):
+        self.handshake_ms.append((time.perf_counter() - ctx.connect_start) * 1000)
+
+    async def _on_reuse(self, session, ctx, params):
+        self.reused += 1
+
+    def snapshot(self):
+        return len(self.handshake_ms), self.reused
+
+    def summary(self, since=(0, 0)):
+        """Describe the connections opened and reused since a `snapshot()`."""
+        created = self.handshake_ms[since[0]:]
+        reused = self.reused - since[1]
+        line = f"{len(created) + reused} connection checkouts: {reused} reused, {len(created)} new"
+        if created:
+            line += f" (handshake avg {sum(created) / len(created):.1f} ms, max {max(created):.1f} ms)"
+        return line
+
+class ConnectionWarmer:
+    """Open `count` connections to the API host and keep them hot until stopped.
+
+    `url` should be cheap for the server to answer; the status of the answer does not matter.
+    """
+
+    def __init__(self, session, url, count, ping_interval, timer=None):
+        self.session = session
+        self.url = url
+        self.count = count
+        self.ping_interval = ping_interval
+        self.timer = timer
+        self.task = None
+        self.warm_ms = None
+        self.warm_handshakes_ms = []
+        self.ping_statuses = {}   # status (or "error") -> count
+
+    async def _touch(self):
+        # Any response keeps the socket in the pool, so the status is only counted for the report
+        try:
+            async with self.session.head(self.url, allow_redirects=False, trace_request_ctx=WARMUP_TRACE) as response:
+                await response.read()
+                status = response.status
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            status = "error"
+        self.ping_statuses[status] = self.ping_statuses.get(status, 0) + 1
+
+    async def warm(self):
+        """Open the pool now: `count` concurrent requests force `count` distinct connections."""
+        first = len(self.timer.handshake_ms) if self.timer else 0
+        started = time.perf_counter()
+        await asyncio.gather(*(self._touch() for _ in range(self.count)))
+        self.warm_ms = (time.perf_counter() - started) * 1000
+        if self.timer:
+            self.warm_handshakes_ms = self.timer.handshake_ms[first:]
+
+    async def _keep_alive(self):
+        await self.warm()
+        while True:
+            await asyncio.sleep(self.ping_interval)
+            await asyncio.gather(*(self._touch() for _ in range(self.count)))
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self._keep_alive())
+        return self.task
+
+    def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+
+    def report(self):
+        if self.timer is None or self.warm_ms is None:
+            return []
+        handshakes = ", ".join(f"{ms:.1f}" for ms in self.warm_handshakes_ms) or "all already open"
+        lines = [f"Pre-warmed {self.count} connections in {self.warm_ms:.1f} ms (new handshakes ms: {handshakes})",
+                 "Warm-up pings answered: " + ", ".join(f"{status}x{n}" for status, n in self.ping_statuses.items())]
+        if self.timer.dns_ms:
+            lines.append(f"DNS resolved {len(self.timer.dns_ms)}x ({self.timer.dns_ms[0]:.1f} ms), "
+                         f"served from cache {self.timer.dns_cache_hits}x")
+        return lines
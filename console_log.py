@@ -0,0 +1,118 @@
+"""Queue-backed console logging for the polling and reservation hot loops.
+
+Log calls only put the record on a queue; a listener thread merges the
+arguments into the message and writes to the terminal, so console I/O never
+blocks the event loop. Records logged with ``extra={"collapse": key}`` are
+folded into one counter line per key such as "seat-layout 422 not-open x 3,214",
+even when several loops interleave their keys. Counters are printed when an
+uncollapsed message arrives, on `flush()`, or every `summary_interval` seconds
+while the run continues.
+"""
+import logging, queue, sys, time
+from logging.handlers import QueueHandler, QueueListener
+from colorama import Fore
+
+log = logging.getLogger("bdrail")
+
+_queue = None
+_listener = None
+_handler = None
+_queue_handler = None
+
+class DeferredQueueHandler(QueueHandler):
+    """Enqueue records untouched: message formatting happens on the listener thread."""
+
+    def prepare(self, record):
+        return record
+
+class CollapsingStreamHandler(logging.StreamHandler):
+    """Write records, folding records that share a collapse key into one counter per key.
+
+    The first record of a key is written; later ones only count until a record without a
+    collapse key arrives, which writes the pending counters first. Counters are also written
+    every `summary_interval` seconds, so interleaved loops (one poller per trip) fold too.
+    """
+
+    def __init__(self, stream=None, summary_interval=2.0):
+        super().__init__(stream)
+        self.summary_interval = summary_interval
+        self.repeats = {}   # collapse key -> records folded since its last counter line
+        self.last_summary = 0.0
+
+    def emit(self, record):
+        key = getattr(record, "collapse", None)
+        if key is None:
+            self.summarize(record.created)
+            self.repeats.clear()   # after other output, a collapsed message is written in full again
+            super().emit(record)
+            return
+        if key in self.repeats:
+            self.repeats[key] += 1
+            if record.created - self.last_summary >= self.summary_interval:
+                self.summarize(record.created)
+            return
+        if not self.repeats:
+            self.last_summary = record.created   # the interval runs from the first folded message
+        self.repeats[key] = 0
+        super().emit(record)
+
+    def summarize(self, now=None):
+        """Write the pending repeat counters, if any."""
+        for key, count in self.repeats.items():
+            if count:
+                self.stream.write(f"{Fore.CYAN}{key} x {count:,}{self.terminator}")
+                self.repeats[key] = 0
+        self.stream.flush()
+        self.last_summary = time.time() if now is None else now
+
+def _resolve_level(level):
+    """Numeric level for a name such as "debug" or a number; None if it is neither."""
+    if isinstance(level, int):
+        return level
+    value = logging.getLevelName(str(level).strip().upper())
+    return value if isinstance(value, int) else None
+
+def start(level="INFO", stream=None, summary_interval=2.0):
+    """Route the "bdrail" logger through a queue to a background writer thread.
+
+    Calling it again while running does nothing, and after `stop()` it replaces the
+    synchronous writer. An unknown level falls back to INFO with a warning.
+    """
+    global _queue, _listener, _handler, _queue_handler
+    if _listener is not None:
+        return log
+    if _handler is not None:
+        log.removeHandler(_handler)   # attached directly by stop()
+    _queue = queue.Queue()
+    _handler = CollapsingStreamHandler(stream or sys.stdout, summary_interval)
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    _listener = QueueListener(_queue, _handler)
+    _listener.start()
+    _queue_handler = DeferredQueueHandler(_queue)
+    log.addHandler(_queue_handler)
+    resolved = _resolve_level(level)
+    log.setLevel(logging.INFO if resolved is None else resolved)
+    log.propagate = False
+    if resolved is None:
+        log.warning(f"{Fore.YELLOW}Unknown LOG_LEVEL %r, using INFO.", level)
+    return log
+
+def flush():
+    """Block until everything logged so far is on the terminal. Call before plain print()s and prompts."""
+    if _listener is None:
+        return
+    _queue.join()
+    with _handler.lock:
+        _handler.summarize()
+
+def stop():
+    """Drain the queue and stop the writer thread; later records are written synchronously."""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    with _handler.lock:
+        _handler.summarize()
+    log.removeHandler(_queue_handler)
+    log.addHandler(_handler)
+    _listener = None
@@ -0,0 +1,250 @@
+"""One client layer for the booking API's endpoints.
+
+EndpointClient.call sends a request until its answer is final and owns what
+each booking step used to repeat in its own loop:
+
+- status classification: 2xx is done, 401 re-authenticates and resends,
+  5xx (including the 508 the confirm endpoint answers with), 429 and
+  connection errors are retried, anything else is a final rejection;
+- error parsing: the API nests its messages as a list, as a dict with
+  `error_msg`, as a dict with `message`/`errorKey`, or under `message`.
+  ApiError flattens all of them into one message and key, and the known
+  messages are matched with precompiled patterns;
+- retries: a bounded number of attempts per call, spaced by the rate
+  controller's adaptive, jittered backoff and cut off by its deadline.
+  Non-idempotent endpoints (confirm) are not resent when no answer came
+  back, since the server may already have acted on the request;
+- a circuit breaker per endpoint: after consecutive retryable failures the
+  endpoint is left alone for a short cool-down, then one probe at a time
+  goes through until one succeeds, so concurrent callers (the reservation
+  lanes) do not stampede an overloaded server.
+
+The seat-layout poller keeps its own hedged loop and only shares the
+classification and error parsing: it must keep polling through the
+overload at the open instant, so it has neither an attempt bound nor a
+breaker.
+"""
+import asyncio, json, re, time
+import aiohttp
+from colorama import Fore
+from console_log import log
+from rate_control import is_congestion, parse_retry_after
+
+# Known server messages
+NOT_OPEN = re.compile(r"ticket purchase for this trip will be available", re.IGNORECASE)
+SEAT_LIMIT = re.compile(r"maximum \d+ seats can be booked at a time", re.IGNORECASE)
+SEAT_TAKEN = re.compile(r"this ticket is not available now", re.IGNORECASE)
+RETRY_AFTER = re.compile(r"(\d+)\s*minute[s]?\s*(\d+)\s*second[s]?", re.IGNORECASE)
+
+# endpoint -> (max attempts per call, consecutive failures that open the breaker, seconds it stays open); None disables
+DEFAULT_POLICIES = {
+    "sign-in":           (20,   5,    2.0),
+    "search-trips-v2":   (30,   5,    2.0),    # the search also waits, up to its deadline, for trips to be listed
+    "seat-layout":       (None, None, None),   # polled by its own loop
+    "reserve-seat":      (40,   12,   0.1),    # tolerant: a 5xx burst at the open instant is expected
+    "passenger-details": (20,   5,    1.0),
+    "verify-otp":        (20,   5,    1.0),
+    "confirm":           (20,   5,    1.0),
+}
+
+# Endpoints whose request may have taken effect even though no response arrived
+NOT_RESENT_WITHOUT_ANSWER = {"confirm"}   # a second confirm would ask for another one-time payment link
+
+def parse_policies(spec):
+    """Parse overrides like "reserve-seat=60/8/0.2,confirm=30/5/1" (attempts/failures/seconds open, 0 disables)."""
+    policies = {}
+    for item in filter(None, (part.strip() for part in (spec or "").split(","))):
+        endpoint, _, values = item.partition("=")
+        numbers = [float(value) for value in values.split("/")]
+        if len(numbers) != 3:
+            raise ValueError(f"Invalid retry policy for {endpoint}: expected attempts/failures/seconds")
+        attempts, failures, reset_timeout = numbers
+        policies[endpoint.strip()] = (int(attempts) or None, int(failures) or None, reset_timeout)
+    return policies
+
+def is_retryable(status):
+    """Whether an attempt that ended with `status` (None: connection error or timeout) is worth repeating."""
+    return is_congestion(status)   # overloaded or throttled: the same request may go through later
+
+class ApiError:
+    """The message and error key of an error response, whichever shape the endpoint used."""
+    __slots__ = ("message", "key")
+
+    def __init__(self, message="", key=""):
+        self.message = message
+        self.key = key
+
+    @classmethod
+    def parse(cls, body):
+        try:
+            data = json.loads(body)
+        except ValueError:
+            return cls(body.decode(errors="replace") if isinstance(body, bytes) else body)
+        error = data.get("error") if isinstance(data, dict) else None
+        if not isinstance(error, dict):
+            return cls("Unknown error.")
+        messages = error.get("messages", error.get("message"))
+        if isinstance(messages, list):
+            return cls(str(messages[0]) if messages else "")
+        if isinstance(messages, dict):
+            return cls(messages.get("error_msg") or messages.get("message", ""), messages.get("errorKey", ""))
+        if isinstance(messages, str):
+            return cls(messages)
+        return cls("Unknown error.")
+
+    def matches(self, pattern):
+        return pattern.search(self.message) is not None
+
+    def __str__(self):
+        return f"{self.message} (ErrorKey: {self.key})" if self.key else self.message
+
+class EndpointResponse:
+    """The final answer of an EndpointClient.call. `status` is None when no response was ever received."""
+    __slots__ = ("status", "body", "_error")
+
+    def __init__(self, status, body):
+        self.status = status
+        self.body = body
+        self._error = None
+
+    @property
+    def ok(self):
+        return self.status is not None and 200 <= self.status < 300
+
+    @property
+    def error(self):
+        if self._error is None:
+            self._error = ApiError.parse(self.body)
+        return self._error
+
+    def json(self):
+        return json.loads(self.body)
+
+    def text(self):
+        return self.body.decode(errors="replace")
+
+class CircuitBreaker:
+    """Closed until `failure_threshold` consecutive retryable failures, then open for `reset_timeout`
+    seconds. After that it is half-open: one probe at a time goes through, and the first success closes it."""
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.open_until = None   # monotonic end of the cool-down; None while closed
+        self.probing = False
+        self.trips = 0
+
+    async def admit(self):
+        """Wait until a request may go out. Returns True if it goes out as the half-open probe."""
+        while self.open_until is not None:
+            delay = self.open_until - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            elif not self.probing:
+                self.probing = True
+                return True
+            else:
+                await asyncio.sleep(self.reset_timeout / 4)   # another caller's probe is in flight
+        return False
+
+    def record(self, failed, probe=False):
+        if probe:
+            self.probing = False
+        if not failed:
+            self.failures = 0
+            self.open_until = None
+            return
+        self.failures += 1
+        if probe or self.failures >= self.failure_threshold:
+            if self.open_until is None:
+                self.trips += 1
+            self.open_until = time.monotonic() + self.reset_timeout
+
+class EndpointClient:
+    def __init__(self, rate_controller, reauthenticate=None, policies=None):
+        """`reauthenticate` is an async callable returning True once a fresh token is in the headers."""
+        self.rate_controller = rate_controller
+        self.reauthenticate = reauthenticate
+        self.policies = {**DEFAULT_POLICIES, **(policies or {})}
+        self.breakers = {}
+        self.gave_up = {}
+
+    def breaker(self, endpoint):
+        """The endpoint's circuit breaker, or None when its policy has none."""
+        if endpoint not in self.breakers:
+            _, failure_threshold, reset_timeout = self.policies.get(endpoint, DEFAULT_POLICIES["search-trips-v2"])
+            self.breakers[endpoint] = CircuitBreaker(failure_threshold, reset_timeout) if failure_threshold else None
+        return self.breakers[endpoint]
+
+    async def _attempt(self, endpoint, send):
+        request_start = time.perf_counter()
+        try:
+            async with send() as response:
+                status = response.status
+                body = await response.read()
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self.rate_controller.record(endpoint)
+            log.warning(f"{Fore.RED}Connection error on %s: %s", endpoint, e, extra={"collapse": f"{endpoint} connection error"})
+            return None, b""
+        self.rate_controller.record(endpoint, status, time.perf_counter() - request_start, retry_after)
+        return status, body
+
+    async def call(self, endpoint, send, authenticated=True):
+        """Send until the answer is final and return it as an EndpointResponse.
+
+        `send` is called once per attempt and returns an aiohttp request context manager, so every
+        attempt picks up the current headers. The response is not ok when the server rejected the
+        request, re-authentication failed or the retries ran out (the last two are logged here).
+        """
+        max_attempts = self.policies.get(endpoint, DEFAULT_POLICIES["search-trips-v2"])[0]
+        breaker = self.breaker(endpoint)
+        retries_started = time.monotonic()   # the rate controller's deadline runs per call
+        attempt = 0
+        while True:
+            attempt += 1
+            probe = await breaker.admit() if breaker else False
+            try:
+                status, body = await self._attempt(endpoint, send)
+            except BaseException:
+                if probe:
+                    breaker.probing = False   # cancelled mid-probe; let the next caller probe
+                raise
+            if breaker:
+                breaker.record(is_retryable(status), probe)
+            response = EndpointResponse(status, body)
+
+            if status is None and endpoint in NOT_RESENT_WITHOUT_ANSWER:
+                log.error(f"{Fore.RED}No answer from %s; not resending it, the request may have gone through.", endpoint)
+                return response
+            if status == 401 and authenticated and self.reauthenticate is not None:
+                if not await self.reauthenticate():
+                    return response
+                resend_now = True   # with the new token
+            elif not is_retryable(status):
+                return response
+            else:
+                if status is not None:
+                    log.warning(f"{Fore.YELLOW}Server overloaded (HTTP %s) on %s. Backing off...", status, endpoint,
+                                extra={"collapse": f"{endpoint} 5xx backoff"})
+                resend_now = False
+
+            if max_attempts is not None and attempt >= max_attempts:
+                return self._give_up(endpoint, f"{attempt} attempts", response)
+            if not resend_now and not await self.rate_controller.backoff(endpoint, retries_started):
+                return self._give_up(endpoint, "retry deadline exceeded", response)
+
+    def _give_up(self, endpoint, reason, response):
+        self.gave_up[endpoint] = self.gave_up.get(endpoint, 0) + 1
+        log.error(f"{Fore.RED}Giving up on %s: %s.", endpoint, reason)
+        return response
+
+    def report(self):
+        lines = []
+        for endpoint, breaker in self.breakers.items():
+            if breaker and breaker.trips:
+                lines.append(f"{endpoint}: circuit opened {breaker.trips} times")
+        for endpoint, count in self.gave_up.items():
+            lines.append(f"{endpoint}: gave up on {count} calls")
+        return lines
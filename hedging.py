@@ -0,0 +1,74 @@
+"""Hedged polling: keep several identical requests in flight on staggered offsets.
+
+When the server is hammered a single slow response stalls a one-at-a-time
+poller for its full duration. HedgedPoller keeps up to `width` requests
+outstanding, launching them at least `stagger` seconds apart, and hands the
+caller whichever response arrives first. Responses that arrive while an
+older request is still outstanding are counted as hedge wins: the
+single-request path would still have been waiting at that point.
+"""
+import asyncio, time
+
+class HedgedPoller:
+    def __init__(self, make_request, stagger):
+        self.make_request = make_request   # zero-argument coroutine factory
+        self.stagger = stagger
+        self.in_flight = {}                # task -> launch sequence number
+        self.last_launch = 0.0
+        self.launched = 0
+        self.responses = 0
+        self.hedge_wins = 0
+        self.head_start_ms = []            # how long the oldest outstanding request had been waiting at each hedge win
+        self.last_was_hedge_win = False
+        self.hedged = False                # True once more than one request was allowed in flight
+        self.launch_times = {}
+
+    def _launch(self):
+        task = asyncio.ensure_future(self.make_request())
+        self.in_flight[task] = self.launched
+        self.launch_times[task] = self.last_launch = time.perf_counter()
+        self.launched += 1
+
+    async def next_response(self, width):
+        """Return the next completed request's result (or raise its exception), topping up to `width` in flight."""
+        self.hedged = self.hedged or width > 1
+        while True:
+            now = time.perf_counter()
+            if len(self.in_flight) < max(1, width) and (not self.in_flight or now - self.last_launch >= self.stagger):
+                self._launch()
+                continue
+
+            timeout = None
+            if len(self.in_flight) < width:
+                timeout = max(0.0, self.stagger - (now - self.last_launch))
+            done, _ = await asyncio.wait(self.in_flight, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if done:
+                return self._take(min(done, key=self.in_flight.get))
+
+    def _take(self, task):
+        sequence = self.in_flight.pop(task)
+        self.launch_times.pop(task)
+        self.responses += 1
+        older = [t for t, seq in self.in_flight.items() if seq < sequence]
+        self.last_was_hedge_win = bool(older)
+        if older:
+            self.hedge_wins += 1
+            oldest_started = min(self.launch_times[t] for t in older)
+            self.head_start_ms.append((time.perf_counter() - oldest_started) * 1000)
+        return task.result()
+
+    def cancel_all(self):
+        for task in self.in_flight:
+            task.cancel()
+        self.in_flight.clear()
+        self.launch_times.clear()
+
+    def report(self):
+        if not self.hedged:
+            return []
+        line = (f"Hedged polling: {self.launched} requests launched, {self.responses} responses used, "
+                f"{self.hedge_wins} ({self.hedge_wins / max(1, self.responses):.1%}) beat an older in-flight request")
+        if self.head_start_ms:
+            line += f" that had been waiting {sum(self.head_start_ms) / len(self.head_start_ms):.1f} ms on average"
+        winner = "a hedge request" if self.last_was_hedge_win else "the oldest in-flight request"
+        return [line, f"The seat layout arrived on {winner}"]
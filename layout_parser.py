@@ -0,0 +1,78 @@
+"""Fast decoding of the seat-layout response.
+
+orjson decodes the whole document when it is installed. Without it,
+pysimdjson parses the body lazily and only the fields seat selection needs
+(floor_name, ticket_id, seat_number, seat_availability) are materialized
+into a compact layout of the same shape; on the benchmark layout that
+selective path is no faster than orjson's full decode, so orjson is
+preferred. The standard json module is the last resort.
+"""
+import json
+
+try:
+    import simdjson
+except ImportError:
+    simdjson = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+    DECODER = "orjson"
+elif simdjson is not None:
+    DECODER = "simdjson"
+else:
+    DECODER = "json"
+
+_simdjson_parser = simdjson.Parser() if simdjson is not None else None
+
+def decode_json(body):
+    """Decode a full JSON body with the fastest available decoder."""
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
+def _compact_seat_layout(seat_layout):
+    """Seat fields of a lazily parsed layout. Coaches, rows and seats that are not objects or lists are skipped."""
+    compact = []
+    for coach in seat_layout:
+        if not isinstance(coach, simdjson.Object):
+            continue
+        rows = coach.get("layout")
+        compact.append({
+            "floor_name": coach.get("floor_name"),
+            "layout": [
+                [{"ticket_id": seat.get("ticket_id"), "seat_number": seat.get("seat_number"),
+                  "seat_availability": seat.get("seat_availability")}
+                 for seat in row if isinstance(seat, simdjson.Object)]
+                for row in rows if isinstance(row, simdjson.Array)
+            ] if isinstance(rows, simdjson.Array) else [],
+        })
+    return compact
+
+def _parse_selective(body):
+    """The compact layout via pysimdjson, or None if the response has no seat layout."""
+    document = _simdjson_parser.parse(body)
+    data = document.get("data") if isinstance(document, simdjson.Object) else None
+    seat_layout = data.get("seatLayout") if isinstance(data, simdjson.Object) else None
+    return _compact_seat_layout(seat_layout) if isinstance(seat_layout, simdjson.Array) else None
+
+def parse_seat_layout(body, fast=True):
+    """Return the `seatLayout` list from a seat-layout response body, or None if it has none.
+
+    A `seatLayout` that is null or not a list counts as none. With `fast` and
+    only pysimdjson available the result is the compact layout; otherwise it
+    is the fully decoded list, exactly as in the response.
+    """
+    if b'"seatLayout"' not in body:
+        return None
+
+    if fast and orjson is None and _simdjson_parser is not None:
+        return _parse_selective(body)
+
+    document = decode_json(body) if fast else json.loads(body)
+    data = document.get("data") if isinstance(document, dict) else None
+    seat_layout = data.get("seatLayout") if isinstance(data, dict) else None
+    return seat_layout if isinstance(seat_layout, list) else None
@@ -0,0 +1,376 @@
+"""Local stand-in for the Shohoz rail API endpoints used by BDRail.py.
+
+Run it with `python mock_server.py --open-in 30` and point BDRail.py at it
+with `API_BASE_URL=http://127.0.0.1:8090/v1.0/app`.
+"""
+import argparse, asyncio, random, time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from email.utils import formatdate
+import jwt
+from aiohttp import web
+
+API_PREFIX = "/v1.0/app"
+
+# Booking-open times in the 422 message are given in Bangladesh time, like the real server
+SERVER_TZ = timezone(timedelta(hours=6))
+
+MOCK_JWT_SECRET = "bdrail-mock-server-signing-key-not-a-secret"
+MOCK_OTP = "123456"
+
+# Bearer tokens of simulated competing buyers (benchmarks/contention.py) start with this; every
+# other token is the booking flow under test, and only its reservations count in the stats
+SYNTHETIC_TOKEN_PREFIX = "synthetic-"
+
+@dataclass
+class MockConfig:
+    host: str = "127.0.0.1"
+    port: int = 8090
+    open_in: float = 10.0              # seconds from server start until booking opens
+    latency_ms: float = 20.0           # mean added latency per request
+    latency_jitter_ms: float = 10.0    # +/- uniform jitter on top of latency_ms
+    slow_rate: float = 0.0             # probability that a response is a slow straggler
+    slow_ms: float = 500.0             # extra latency for those stragglers
+    error_rate: float = 0.0            # probability of a random 5xx on any request
+    burst_error_rate: float = 0.0      # 5xx probability during the burst right after open
+    burst_seconds: float = 0.0         # length of that burst window
+    clock_skew: float = 0.0            # server clock minus local clock, in seconds
+    coaches: int = 6
+    seats_per_coach: int = 60
+    availability: float = 0.6          # fraction of seats available once booking opens
+    contention: float = 0.0            # probability that another buyer has just taken a seat we ask for
+    cancellation_rate: float = 0.0     # taken seats freed again per second after open (cancellations, expired holds)
+    train_number: str = "705"
+    other_trains: str = "753,769"      # extra trains listed by search-trips-v2
+    trip_open_stagger: float = 0.0     # each further train opens this many seconds after the previous one
+    seat_class: str = "S_CHAIR"
+    otp: str = MOCK_OTP
+    token_ttl: float = 3600.0          # lifetime of issued auth tokens, in seconds
+    seed: int = 0
+
+COACH_NAMES = ["UMA", "CHA", "SCHA", "JA", "JHA", "NEO", "TA", "THA", "DA", "DHA", "KA", "KHA", "GA", "GHA"]
+
+def build_seat_layout(config):
+    """Build a seatLayout list shaped like the real response: coaches -> rows -> seats."""
+    rng = random.Random(config.seed)
+    layout = []
+    ticket_id = 100000
+    for coach_index in range(config.coaches):
+        coach_name = COACH_NAMES[coach_index % len(COACH_NAMES)]
+        if coach_index >= len(COACH_NAMES):
+            coach_name = f"{coach_name}{coach_index // len(COACH_NAMES)}"
+        rows = []
+        for row_start in range(1, config.seats_per_coach + 1, 4):
+            row = []
+            for seat_no in range(row_start, min(row_start + 4, config.seats_per_coach + 1)):
+                ticket_id += 1
+                row.append({
+                    "ticket_id": ticket_id,
+                    "seat_number": f"{coach_name}-{seat_no}",
+                    "seat_availability": 1 if rng.random() < config.availability else 0,
+                    "ticket_type": 1,
+                })
+            rows.append(row)
+        layout.append({"floor_name": coach_name, "layout": rows})
+    return layout
+
+class MockState:
+    def __init__(self, config):
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.started_at = time.monotonic()
+        self.open_at = self.started_at + config.open_in
+        self.open_at_wall = time.time() + config.clock_skew + config.open_in  # in server clock
+        self.seat_layout = build_seat_layout(config)
+        self.seats = {seat["ticket_id"]: seat for coach in self.seat_layout for row in coach["layout"] for seat in row}
+        self.reserved_by = {}   # ticket_id -> token (None: taken by another buyer)
+        self.cancellations = 0
+        self.first_ack_at = None
+        self.first_ack_opened_at = None   # open instant of the trip that got the first ack
+        self.reserve_attempts = 0         # reserve-seat requests from the flow under test that reached a seat race
+        self.ack_after_open = []          # seconds from its trip's open to each of its acks
+        self.request_counts = {}
+        self.status_counts = {}
+
+    def open_delay(self, trip_or_route_id):
+        """Extra seconds until the trip opens. Trip and route ids are numbered 10 apart per train."""
+        try:
+            train_index = (int(trip_or_route_id) % 1000 - 1) // 10
+        except (TypeError, ValueError):
+            train_index = 0
+        return max(0, train_index) * self.config.trip_open_stagger
+
+    def is_open(self, trip_or_route_id=None):
+        return time.monotonic() >= self.open_at + self.open_delay(trip_or_route_id)
+
+    def apply_cancellations(self):
+        """Free taken seats (never ones we hold) at `cancellation_rate` per second since open."""
+        due = int((time.monotonic() - self.open_at) * self.config.cancellation_rate) - self.cancellations
+        for _ in range(max(0, due)):
+            taken = [ticket_id for ticket_id, seat in self.seats.items()
+                     if self.reserved_by.get(ticket_id, 0) is None or (seat["seat_availability"] != 1 and ticket_id not in self.reserved_by)]
+            self.cancellations += 1
+            if not taken:
+                break
+            ticket_id = self.rng.choice(taken)
+            self.seats[ticket_id]["seat_availability"] = 1
+            self.reserved_by.pop(ticket_id, None)
+
+    def stats(self):
+        time_to_reserve = None
+        if self.first_ack_at is not None:
+            time_to_reserve = (self.first_ack_at - self.first_ack_opened_at) * 1000
+        return {
+            "open_in_remaining_s": max(0.0, self.open_at - time.monotonic()),
+            "first_ack_after_open_ms": time_to_reserve,
+            "reserved_seats": sum(1 for holder in self.reserved_by.values() if holder is not None and not is_synthetic(holder)),
+            "synthetic_reserved_seats": sum(1 for holder in self.reserved_by.values() if holder is not None and is_synthetic(holder)),
+            "reserve_attempts": self.reserve_attempts,
+            "ack_after_open_ms": [seconds * 1000 for seconds in self.ack_after_open],
+            "cancellations": self.cancellations,
+            "requests": self.request_counts,
+            "statuses": {str(k): v for k, v in self.status_counts.items()},
+        }
+
+def is_synthetic(token):
+    return token is not None and token.startswith(SYNTHETIC_TOKEN_PREFIX)
+
+def _error(status, messages):
+    return web.json_response({"error": {"messages": messages}}, status=status)
+
+def _bearer_token(request):
+    auth = request.headers.get("Authorization", "")
+    return auth[len("Bearer "):] if auth.startswith("Bearer ") else None
+
+@web.middleware
+async def simulate_network(request, handler):
+    """Add latency and random 5xx responses, and count what was served."""
+    state = request.app["state"]
+    config = state.config
+    endpoint = request.path[len(API_PREFIX) + 1:] if request.path.startswith(API_PREFIX) else request.path
+    state.request_counts[endpoint] = state.request_counts.get(endpoint, 0) + 1
+
+    delay = config.latency_ms + state.rng.uniform(-config.latency_jitter_ms, config.latency_jitter_ms)
+    if state.rng.random() < config.slow_rate:
+        delay += config.slow_ms
+    if delay > 0:
+        await asyncio.sleep(delay / 1000)
+
+    error_rate = config.error_rate
+    since_open = time.monotonic() - state.open_at
+    if 0 <= since_open < config.burst_seconds:
+        error_rate = max(error_rate, config.burst_error_rate)
+
+    if request.path.startswith(API_PREFIX) and state.rng.random() < error_rate:
+        response = web.Response(status=state.rng.choice([500, 502, 503, 504]), text="Service Unavailable")
+    elif request.path.startswith(f"{API_PREFIX}/bookings/") and not is_authorized(request):
+        response = _error(401, ["Unauthenticated."])
+    else:
+        try:
+            response = await handler(request)
+        except ConnectionResetError:
+            # The client cancelled mid-request (a losing hedge or parallel poller); nobody reads this
+            response = web.Response(status=499)
+    state.status_counts[response.status] = state.status_counts.get(response.status, 0) + 1
+    if config.clock_skew:
+        response.headers["Date"] = formatdate(time.time() + config.clock_skew, usegmt=True)
+    return response
+
+def is_authorized(request):
+    token = _bearer_token(request)
+    if not token:
+        return False
+    if is_synthetic(token):
+        return True   # competing clients simulated by benchmarks/contention.py
+    try:
+        jwt.decode(token, MOCK_JWT_SECRET, algorithms=["HS256"])
+    except jwt.PyJWTError:
+        return False
+    return True
+
+async def sign_in(request):
+    state = request.app["state"]
+    if request.content_type == "application/json":
+        form = await request.json()
+    else:
+        form = await request.post()
+    mobile_number = form.get("mobile_number")
+    if not mobile_number or not form.get("password"):
+        return _error(422, ["Mobile number and password are required."])
+
+    claims = {
+        "sub": mobile_number,
+        "phone_number": mobile_number,
+        "email": f"{mobile_number}@example.com",
+        "display_name": "Mock Passenger",
+        "iat": int(time.time()),
+        "exp": int(time.time() + state.config.token_ttl),
+        "jti": f"{state.rng.getrandbits(64):016x}",
+    }
+    token = jwt.encode(claims, MOCK_JWT_SECRET, algorithm="HS256")
+    return web.json_response({"data": {"token": token}})
+
+async def search_trips(request):
+    state = request.app["state"]
+    config = state.config
+    train_numbers = [config.train_number] + [t for t in config.other_trains.split(",") if t]
+    trains = []
+    for train_index, train_number in enumerate(train_numbers):
+        base = 5001 + train_index * 10
+        trains.append({
+            "trip_number": f"MOCK EXPRESS ({train_number})",
+            "train_model": train_number,
+            "boarding_points": [{"trip_point_id": 9001 + train_index, "location_name": request.query.get("from_city", "")}],
+            "seat_types": [
+                {"type": config.seat_class, "trip_id": base, "trip_route_id": base + 2000, "seat_counts": {"online": len(state.seats)}},
+                {"type": "SNIGDHA", "trip_id": base + 1, "trip_route_id": base + 2001, "seat_counts": {"online": 0}},
+            ],
+        })
+    return web.json_response({"data": {"trains": trains}})
+
+async def seat_layout(request):
+    state = request.app["state"]
+    payload = await request.json() if request.can_read_body else {}
+    trip_id = payload.get("trip_id")
+    if not state.is_open(trip_id):
+        open_at = datetime.fromtimestamp(state.open_at_wall + state.open_delay(trip_id), SERVER_TZ)
+        return _error(422, [f"Ticket purchase for this trip will be available from {open_at:%d-%b-%Y %I:%M:%S %p}"])
+
+    state.apply_cancellations()
+    layout = [
+        {"floor_name": coach["floor_name"], "layout": [
+            [dict(seat, seat_availability=0 if seat["ticket_id"] in state.reserved_by else seat["seat_availability"]) for seat in row]
+            for row in coach["layout"]
+        ]}
+        for coach in state.seat_layout
+    ]
+    return web.json_response({"data": {"seatLayout": layout}})
+
+async def reserve_seat(request):
+    state = request.app["state"]
+    token = _bearer_token(request)
+    payload = await request.json()
+    ticket_id = payload.get("ticket_id")
+    seat = state.seats.get(ticket_id)
+
+    if not state.is_open(payload.get("route_id")):
+        return _error(422, {"error_msg": "Ticket purchase for this trip is not available yet."})
+    if sum(1 for holder in state.reserved_by.values() if holder == token) >= 4:
+        return _error(422, {"error_msg": "Maximum 4 seats can be booked at a time."})
+    synthetic = is_synthetic(token)
+    if not synthetic:
+        state.reserve_attempts += 1
+    if seat is not None and ticket_id not in state.reserved_by and state.rng.random() < state.config.contention:
+        state.reserved_by[ticket_id] = None   # lost the race to another buyer
+    # First come, first served: the first request to get here takes the seat
+    if seat is None or seat["seat_availability"] != 1 or ticket_id in state.reserved_by:
+        return _error(422, {"error_msg": "Sorry! this ticket is not available now."})
+
+    state.reserved_by[ticket_id] = token
+    if not synthetic:
+        opened_at = state.open_at + state.open_delay(payload.get("route_id"))
+        state.ack_after_open.append(time.monotonic() - opened_at)
+        if state.first_ack_at is None:
+            state.first_ack_at = time.monotonic()
+            state.first_ack_opened_at = opened_at
+    return web.json_response({"data": {"ack": 1, "ticket_id": ticket_id}})
+
+async def passenger_details(request):
+    payload = await request.json()
+    if not payload.get("ticket_ids"):
+        return _error(422, ["No ticket selected."])
+    return web.json_response({"data": {"success": True, "msg": "OTP sent to your mobile number."}})
+
+async def verify_otp(request):
+    state = request.app["state"]
+    payload = await request.json()
+    if str(payload.get("otp")) != state.config.otp:
+        return web.json_response(
+            {"error": {"message": {"message": "The OTP does not match.", "errorKey": "OtpNotVerified"}}}, status=422)
+    return web.json_response({"data": {"success": True}})
+
+async def confirm(request):
+    payload = await request.json()
+    if not payload.get("ticket_ids"):
+        return _error(422, ["No ticket selected."])
+    return web.json_response({"data": {"redirectUrl": "http://127.0.0.1/mock-payment/only-once"}})
+
+async def mock_stats(request):
+    return web.json_response(request.app["state"].stats())
+
+def create_app(config):
+    app = web.Application(middlewares=[simulate_network])
+    app["state"] = MockState(config)
+    app.router.add_post(f"{API_PREFIX}/auth/sign-in", sign_in)
+    app.router.add_get(f"{API_PREFIX}/bookings/search-trips-v2", search_trips)
+    app.router.add_get(f"{API_PREFIX}/bookings/seat-layout", seat_layout)
+    app.router.add_patch(f"{API_PREFIX}/bookings/reserve-seat", reserve_seat)
+    app.router.add_post(f"{API_PREFIX}/bookings/passenger-details", passenger_details)
+    app.router.add_post(f"{API_PREFIX}/bookings/verify-otp", verify_otp)
+    app.router.add_patch(f"{API_PREFIX}/bookings/confirm", confirm)
+    app.router.add_get("/__mock/stats", mock_stats)
+    return app
+
+async def start_mock_server(config):
+    """Start the mock server on the running loop. Returns (runner, app); call runner.cleanup() to stop."""
+    app = create_app(config)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, config.host, config.port)
+    await site.start()
+    return runner, app
+
+def base_url(config):
+    return f"http://{config.host}:{config.port}{API_PREFIX}"
+
+def add_config_arguments(parser):
+    defaults = MockConfig()
+    parser.add_argument("--host", default=defaults.host)
+    parser.add_argument("--port", type=int, default=defaults.port)
+    parser.add_argument("--open-in", type=float, default=defaults.open_in, help="seconds until booking opens")
+    parser.add_argument("--latency-ms", type=float, default=defaults.latency_ms)
+    parser.add_argument("--latency-jitter-ms", type=float, default=defaults.latency_jitter_ms)
+    parser.add_argument("--slow-rate", type=float, default=defaults.slow_rate, help="probability of a slow straggler response")
+    parser.add_argument("--slow-ms", type=float, default=defaults.slow_ms)
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate, help="probability of a 5xx per request")
+    parser.add_argument("--burst-error-rate", type=float, default=defaults.burst_error_rate, help="5xx probability right after open")
+    parser.add_argument("--burst-seconds", type=float, default=defaults.burst_seconds)
+    parser.add_argument("--clock-skew", type=float, default=defaults.clock_skew, help="server clock minus local clock (s)")
+    parser.add_argument("--coaches", type=int, default=defaults.coaches)
+    parser.add_argument("--seats-per-coach", type=int, default=defaults.seats_per_coach)
+    parser.add_argument("--availability", type=float, default=defaults.availability)
+    parser.add_argument("--contention", type=float, default=defaults.contention,
+                        help="probability that a requested seat was just taken by someone else")
+    parser.add_argument("--cancellation-rate", type=float, default=defaults.cancellation_rate,
+                        help="taken seats freed again per second after open")
+    parser.add_argument("--train-number", default=defaults.train_number)
+    parser.add_argument("--other-trains", default=defaults.other_trains, help="comma-separated extra train numbers")
+    parser.add_argument("--trip-open-stagger", type=float, default=defaults.trip_open_stagger,
+                        help="seconds between the booking-open times of successive trains")
+    parser.add_argument("--seat-class", default=defaults.seat_class)
+    parser.add_argument("--token-ttl", type=float, default=defaults.token_ttl, help="auth token lifetime (s)")
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+
+def config_from_args(args):
+    return MockConfig(**{field: getattr(args, field) for field in MockConfig.__dataclass_fields__ if hasattr(args, field)})
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Shohoz rail API.")
+    add_config_arguments(parser)
+    config = config_from_args(parser.parse_args())
+
+    async def serve():
+        runner, _ = await start_mock_server(config)
+        print(f"Mock Shohoz API listening on {base_url(config)} (booking opens in {config.open_in:.1f}s, OTP {config.otp})")
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await runner.cleanup()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""Run bookings for several accounts at once, sharded across CPU cores.
+
+Jobs are read from a JSON file: a list of objects whose keys are the same
+environment variable names BDRail.py reads, layered over the environment
+(and .env), plus an optional "name":
+
+    [
+      {"name": "rahim", "MOBILE_NUMBER": "017...", "PASSWORD": "...", "TRAIN_NUMBER": "705",
+       "SEAT_CLASS": "S_CHAIR", "MAX_SELECTABLE_SEAT": 2, "PASSENGER_NAMES": ["Karim"]},
+      {"name": "sumi", "MOBILE_NUMBER": "018...", "PASSWORD": "...", "TRAIN_NUMBER": "753", ...}
+    ]
+
+Worker processes have no terminal, so every job reads its OTP from its own
+file (.bdrail_otp.<name>) unless it sets OTP_SOURCES to fifo or http, which
+also get a per-job pipe and port; stdin is rejected. Missing passenger names
+and payment methods are asked for up front, then the
+jobs are dealt round-robin to a process pool. Each worker runs its jobs as
+BookingSessions on one asyncio loop. Every job signs in as soon as its worker
+is up and starts searching and polling at the same wall-clock instant. The
+results and phase timings of all jobs are gathered into one report.
+
+    python orchestrator.py jobs.json --workers 4 --start-in 5 --report report.json
+"""
+import argparse, asyncio, json, os, time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from dotenv import load_dotenv
+from colorama import Fore
+import console_log
+from connection_warmup import HandshakeTimer
+from run_metrics import RunMetrics
+from booking_session import BookingAborted, BookingConfig, BookingSession, collect_booking_details, create_http_session
+from trip_resolver import SearchCache
+
+# Phases shown as columns in the printed report
+REPORT_PHASES = ("login", "trip-search", "wait-for-open", "reserve-seat", "passenger-details", "otp-wait", "confirm")
+
+def load_jobs(path, base_env=None):
+    """Read the jobs file into [(name, BookingConfig)]."""
+    base_env = dict(os.environ if base_env is None else base_env)
+    with open(path, "r", encoding="utf-8") as f:
+        specs = json.load(f)
+    if not isinstance(specs, list):
+        raise ValueError(f"{path} must hold a JSON list of jobs")
+
+    base_http_port = int(base_env.get("OTP_HTTP_PORT", "8765"))
+    jobs = []
+    for i, spec in enumerate(specs):
+        spec = dict(spec)
+        name = str(spec.pop("name", f"job{i + 1}"))
+        if any(name == existing for existing, _ in jobs):
+            raise ValueError(f"Duplicate job name '{name}'")
+        env = dict(base_env)
+        # Workers have no terminal, so each job takes its OTP from its own file by default, and every
+        # OTP input and journal is its own (a job may still pick fifo or http, or set these itself)
+        env["OTP_SOURCES"] = "file"
+        env["OTP_FILE"] = f".bdrail_otp.{name}"
+        env["OTP_FIFO"] = f".bdrail_otp.{name}.fifo"
+        env["OTP_HTTP_PORT"] = str(base_http_port + i)
+        env["BOOKING_JOURNAL"] = f".bdrail_journal.{name}.jsonl"
+        for key, value in spec.items():
+            env[key] = ",".join(map(str, value)) if isinstance(value, list) else str(value)
+        if "stdin" in (source.strip().lower() for source in env["OTP_SOURCES"].split(",")):
+            raise ValueError(f"Job '{name}': OTP_SOURCES cannot include stdin; worker processes have no terminal (use file, fifo or http)")
+        jobs.append((name, BookingConfig.from_env(env)))
+    return jobs
+
+def shard_jobs(jobs, workers):
+    return [shard for shard in (jobs[i::workers] for i in range(workers)) if shard]
+
+async def run_job(name, config, start_at, search_cache=None):
+    metrics = RunMetrics()
+    handshake_timer = HandshakeTimer()
+    result = {"job": name, "worker": os.getpid(), "mobile_number": config.mobile_number,
+              "success": False, "error": None, "trip": None, "seats": []}
+    booking = None
+    try:
+        async with create_http_session(config, [handshake_timer.trace_config(), metrics.trace_config()]) as http:
+            booking = BookingSession(config, http, metrics, handshake_timer, search_cache=search_cache)
+            result["success"] = await booking.run(start_at)
+    except BookingAborted as e:
+        result["error"] = str(e)
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    if booking is not None and booking.trip is not None:
+        result["trip"] = f"{booking.trip.train_name} ({booking.trip.seat_class})"
+        result["seats"] = [booking.reserved_seats[ticket] for ticket in booking.ticket_ids if ticket in booking.reserved_seats]
+    result["metrics"] = metrics.to_dict()
+    return result
+
+async def run_jobs(jobs, start_at):
+    # Jobs on the same route and date start together; one shared cache lets them share one search
+    search_cache = SearchCache(max(config.search_cache_ttl for _, config in jobs))
+    return await asyncio.gather(*(run_job(name, config, start_at, search_cache) for name, config in jobs))
+
+def run_shard(jobs, start_at, log_level="INFO"):
+    """Process-pool entry point: run `jobs` concurrently on one event loop. Returns their results."""
+    console_log.start(log_level)
+    try:
+        return asyncio.run(run_jobs(jobs, start_at))
+    finally:
+        console_log.stop()
+
+def run_orchestrated(jobs, workers, start_at, log_level="INFO"):
+    """Shard `jobs` over `workers` processes and return every job's result, in job order."""
+    order = {name: i for i, (name, _) in enumerate(jobs)}
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(run_shard, shard, start_at, log_level): shard for shard in shard_jobs(jobs, workers)}
+        for future in as_completed(futures):
+            try:
+                results.extend(future.result())
+            except Exception as e:
+                # A worker that died takes its whole shard with it
+                results.extend({"job": name, "worker": None, "mobile_number": config.mobile_number, "success": False,
+                                "error": f"worker failed: {type(e).__name__}: {e}", "trip": None, "seats": [], "metrics": None}
+                               for name, config in futures[future])
+    return sorted(results, key=lambda result: order[result["job"]])
+
+def report_lines(results):
+    header = f"{'job':<12} {'result':<9} {'trip':<30} {'seats':<24} " + " ".join(f"{phase[:13]:>13}" for phase in REPORT_PHASES) + f" {'total':>9}"
+    lines = [header, "-" * len(header)]
+    for result in results:
+        totals = result["metrics"]["phase_totals_ms"] if result["metrics"] else {}
+        phases = " ".join(f"{totals[phase]:>10.1f} ms" if phase in totals else f"{'-':>13}" for phase in REPORT_PHASES)
+        total = f"{result['metrics']['duration_ms'] / 1000:>8.1f}s" if result["metrics"] else f"{'-':>9}"
+        outcome = "booked" if result["success"] else "failed"
+        lines.append(f"{result['job']:<12} {outcome:<9} {(result['trip'] or '-'):<30} {(', '.join(result['seats']) or '-'):<24} {phases} {total}")
+        if result["error"]:
+            lines.append(f"{'':<12} {result['error']}")
+    booked = [result for result in results if result["success"]]
+    lines.append(f"{len(booked)}/{len(results)} jobs booked, {sum(len(result['seats']) for result in booked)} seats")
+    return lines
+
+def parse_start_at(args):
+    if args.start_at:
+        clock = datetime.strptime(args.start_at, "%H:%M:%S" if args.start_at.count(":") == 2 else "%H:%M").time()
+        return datetime.combine(datetime.now().date(), clock).timestamp()
+    return time.time() + args.start_in
+
+def main():
+    parser = argparse.ArgumentParser(description="Book for several accounts at once across a process pool.")
+    parser.add_argument("jobs", help="JSON file with a list of jobs (environment variable names as keys)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU core, at most one per job)")
+    parser.add_argument("--start-in", type=float, default=5.0, help="seconds from now until every job starts searching")
+    parser.add_argument("--start-at", help="local wall-clock start time (HH:MM or HH:MM:SS) instead of --start-in")
+    parser.add_argument("--report", help="also write the per-job results and timings to this JSON file")
+    args = parser.parse_args()
+
+    load_dotenv()
+    jobs = load_jobs(args.jobs)
+    if not jobs:
+        parser.error(f"{args.jobs} has no jobs")
+    workers = max(1, min(args.workers or os.cpu_count() or 1, len(jobs)))
+
+    # Every prompt happens here, before the workers start
+    for name, config in jobs:
+        print(f"{Fore.CYAN}[{name}] {config.mobile_number}: {config.from_city} to {config.to_city} on {config.date_of_journey}, train {config.train_number} ({config.seat_class})")
+        collect_booking_details(config)
+        sources = [source.strip().lower() for source in config.otp_sources.split(",")]
+        if "file" in sources:
+            print(f"{Fore.CYAN}[{name}] Write the OTP to {config.otp_file}")
+        if "fifo" in sources:
+            print(f"{Fore.CYAN}[{name}] Or echo it into {config.otp_fifo}")
+        if "http" in sources:
+            print(f"{Fore.CYAN}[{name}] Or POST it to http://{config.otp_http_host}:{config.otp_http_port}/otp")
+
+    start_at = parse_start_at(args)
+    print(f"{Fore.YELLOW}Running {len(jobs)} jobs on {workers} workers; searching starts at {time.strftime('%I:%M:%S %p', time.localtime(start_at))}.")
+    results = run_orchestrated(jobs, workers, start_at, os.getenv("LOG_LEVEL", "INFO"))
+
+    print(f"\n{Fore.CYAN}Orchestrator report:")
+    for line in report_lines(results):
+        print(f"{Fore.CYAN}{line}")
+    if args.report:
+        tmp_path = f"{args.report}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"start_at": start_at, "workers": workers, "jobs": results}, f, indent=2)
+        os.replace(tmp_path, args.report)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+"""Automatic OTP ingestion from several local inputs at once.
+
+An OtpReceiver races its sources and returns whichever OTP arrives first:
+
+- stdin: the OTP typed at the prompt
+- file: a file that something (e.g. a sync tool) writes the SMS text into
+- fifo: a named pipe, e.g. `echo 123456 > .bdrail_otp.fifo`
+- http: a small local endpoint an SMS-forwarding phone can POST to,
+  e.g. `curl -d "Your OTP is 123456" http://host:8765/otp`
+
+Every source only accepts OTPs that arrive after `arm()` (called right
+before the OTP is requested) and never hands out the same arrival twice,
+so a stale or rejected code is not submitted again. A source whose input
+has ended (stdin at EOF) raises OtpSourceClosed and drops out of the race;
+when no source is left, the receiver raises it too.
+"""
+import asyncio, json, os, re, stat, threading
+from urllib.parse import parse_qs, unquote_plus
+from aiohttp import web
+from console_log import log
+
+OTP_PATTERN = re.compile(r"(?<!\d)(\d{4,8})(?!\d)")
+
+class OtpSourceClosed(Exception):
+    """An OTP source, or every source of a receiver, can deliver no more OTPs."""
+
+def extract_otp(text):
+    """First 4-8 digit number in `text` (a bare OTP or a whole SMS), or None."""
+    match = OTP_PATTERN.search(text or "")
+    return match.group(1) if match else None
+
+class StdinOtpSource:
+    name = "stdin"
+
+    def __init__(self):
+        self.pending = None   # a blocked input() cannot be cancelled, so an unfinished read is reused
+        self.closed = False
+
+    async def start(self):
+        pass
+
+    def arm(self):
+        pass
+
+    def _read_line(self, prompt):
+        # A daemon thread rather than asyncio.to_thread: a read still blocked when another
+        # source wins must not keep the interpreter from exiting
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def deliver(line):
+            if not future.done():
+                future.set_result(line)
+
+        def read():
+            try:
+                line = input(prompt)
+            except (EOFError, OSError):
+                line = None
+            try:
+                loop.call_soon_threadsafe(deliver, line)
+            except RuntimeError:   # loop already closed
+                pass
+
+        threading.Thread(target=read, daemon=True).start()
+        return future
+
+    async def next_otp(self, prompt):
+        if self.closed:
+            raise OtpSourceClosed("stdin is closed")
+        if self.pending is None:
+            self.pending = self._read_line(prompt)
+        else:
+            print(prompt, end="", flush=True)
+        while True:
+            line = await asyncio.shield(self.pending)
+            self.pending = None
+            if line is None:
+                self.closed = True   # leave it to the other sources
+                raise OtpSourceClosed("stdin is closed")
+            otp = extract_otp(line)
+            if otp:
+                return otp
+            self.pending = self._read_line(prompt)
+
+    async def stop(self):
+        pass
+
+class FileOtpSource:
+    """Poll a file and take the OTP from it whenever it is rewritten after `arm()`."""
+    name = "file"
+
+    def __init__(self, path, poll_interval=0.05):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.seen_mtime = None
+
+    async def start(self):
+        self.arm()
+
+    def _mtime(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def arm(self):
+        self.seen_mtime = self._mtime()
+
+    async def next_otp(self, prompt):
+        while True:
+            mtime = self._mtime()
+            if mtime is not None and mtime != self.seen_mtime:
+                self.seen_mtime = mtime
+                try:
+                    with open(self.path, "r", encoding="utf-8", errors="replace") as f:
+                        otp = extract_otp(f.read())
+                except OSError:
+                    otp = None
+                if otp:
+                    return otp
+            await asyncio.sleep(self.poll_interval)
+
+    async def stop(self):
+        pass
+
+class FifoOtpSource:
+    """Read OTPs written to a named pipe (created if missing) without blocking the event loop."""
+    name = "fifo"
+
+    def __init__(self, path):
+        self.path = path
+        self.read_fd = None
+        self.keep_open_fd = None   # our own writer, so the pipe never reports EOF between writers
+        self.buffer = b""
+        self.lines = asyncio.Queue()
+
+    async def start(self):
+        if not os.path.exists(self.path):
+            os.mkfifo(self.path, 0o600)
+        elif not stat.S_ISFIFO(os.stat(self.path).st_mode):
+            raise ValueError(f"{self.path} exists and is not a named pipe")
+        self.read_fd = os.open(self.path, os.O_RDONLY | os.O_NONBLOCK)
+        self.keep_open_fd = os.open(self.path, os.O_WRONLY | os.O_NONBLOCK)
+        asyncio.get_running_loop().add_reader(self.read_fd, self._on_readable)
+
+    def _on_readable(self):
+        try:
+            chunk = os.read(self.read_fd, 4096)
+        except BlockingIOError:
+            return
+        self.buffer += chunk
+        *lines, self.buffer = self.buffer.split(b"\n")
+        for line in lines:
+            self.lines.put_nowait(line.decode(errors="replace"))
+
+    def arm(self):
+        while not self.lines.empty():
+            self.lines.get_nowait()
+
+    async def next_otp(self, prompt):
+        while True:
+            otp = extract_otp(await self.lines.get())
+            if otp:
+                return otp
+
+    async def stop(self):
+        if self.read_fd is not None:
+            asyncio.get_running_loop().remove_reader(self.read_fd)
+            os.close(self.read_fd)
+            os.close(self.keep_open_fd)
+            self.read_fd = self.keep_open_fd = None
+
+class HttpOtpSource:
+    """Accept `POST /otp` with the OTP or the whole SMS as the body, a form field or a JSON field ("otp"/"text"/"message")."""
+    name = "http"
+
+    def __init__(self, host, port, token=None):
+        self.host = host
+        self.port = port
+        self.token = token
+        self.runner = None
+        self.received = asyncio.Queue()
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/otp", self._handle)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, self.host, self.port).start()
+
+    async def _handle(self, request):
+        if self.token and request.headers.get("X-OTP-Token", request.query.get("token")) != self.token:
+            return web.Response(status=403, text="forbidden\n")
+        raw = await request.text()
+        fields = {}
+        if request.content_type == "application/json":
+            try:
+                fields = json.loads(raw)
+            except ValueError:
+                pass
+        elif request.content_type == "application/x-www-form-urlencoded":
+            fields = {key: values[0] for key, values in parse_qs(raw).items()}
+        # Known fields first; otherwise the body is the SMS text itself (e.g. `curl -d "Your OTP is 123456"`)
+        text = " ".join(str(fields.get(key, "")) for key in ("otp", "text", "message")) if isinstance(fields, dict) else ""
+        otp = extract_otp(text) or extract_otp(unquote_plus(raw) if request.content_type == "application/x-www-form-urlencoded" else raw)
+        if not otp:
+            return web.Response(status=422, text="no OTP found\n")
+        self.received.put_nowait(otp)
+        return web.Response(text="ok\n")
+
+    def arm(self):
+        while not self.received.empty():
+            self.received.get_nowait()
+
+    async def next_otp(self, prompt):
+        return await self.received.get()
+
+    async def stop(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
+
+class OtpReceiver:
+    def __init__(self, sources):
+        self.sources = sources
+        self.closed = set()   # names of sources that raised OtpSourceClosed
+
+    async def start(self):
+        for source in self.sources:
+            await source.start()
+
+    def arm(self):
+        """Forget anything that arrived so far; call right before the OTP is requested."""
+        for source in self.sources:
+            source.arm()
+
+    async def receive(self, prompt):
+        """Wait for the first OTP from any source. Returns (otp, source name).
+
+        Raises OtpSourceClosed once every source is closed.
+        """
+        tasks = {asyncio.ensure_future(source.next_otp(prompt)): source
+                 for source in self.sources if source.name not in self.closed}
+        try:
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    try:
+                        return task.result(), tasks[task].name
+                    except OtpSourceClosed as e:
+                        log.warning("OTP source %s closed: %s. Waiting on the others.", tasks[task].name, e)
+                        self.closed.add(tasks[task].name)
+            raise OtpSourceClosed(f"no OTP source left (closed: {', '.join(sorted(self.closed)) or 'none'})")
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def stop(self):
+        for source in self.sources:
+            await source.stop()
+
+def build_otp_receiver(names, file_path, fifo_path, http_host, http_port, http_token=None):
+    """OtpReceiver for a comma-separated list of source names ("stdin,file,fifo,http")."""
+    factories = {
+        "stdin": StdinOtpSource,
+        "file": lambda: FileOtpSource(file_path),
+        "fifo": lambda: FifoOtpSource(fifo_path),
+        "http": lambda: HttpOtpSource(http_host, http_port, http_token),
+    }
+    sources = []
+    for name in filter(None, (part.strip().lower() for part in names.split(","))):
+        if name not in factories:
+            raise ValueError(f"Unknown OTP source '{name}' (expected one of {', '.join(factories)})")
+        sources.append(factories[name]())
+    return OtpReceiver(sources or [StdinOtpSource()])
@@ -0,0 +1,142 @@
+"""Adaptive per-endpoint pacing and retry backoff (AIMD with jitter).
+
+Each endpoint has a request interval bounded by [min_interval, max_interval].
+Healthy responses shrink the interval quickly (multiplicative ramp-up while
+below the last congestion point, additive afterwards); 5xx and 429
+responses, connection errors and latency spikes double it, and a
+Retry-After from the server holds the endpoint's requests off until then. Retry sleeps are jittered
+so concurrent retries do not synchronize, and each endpoint has an optional
+deadline, counted from the start of each call's retry sequence, after which
+the caller should give up instead of spinning forever.
+"""
+import asyncio, random, time
+from email.utils import parsedate_to_datetime
+
+THROTTLED = 429   # Too Many Requests
+
+def is_congestion(status):
+    """Whether an attempt that ended with `status` (None: connection error or timeout) signals an overloaded server."""
+    return status is None or status >= 500 or status == THROTTLED
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delay in seconds or an HTTP date), or None."""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+class EndpointBudget:
+    def __init__(self, start_interval, min_interval, max_interval, deadline=None):
+        self.interval = start_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.deadline = deadline            # seconds from the start of a call's retries, or None
+        self.ramp_threshold = min_interval  # interval at the last congestion event
+        self.latency_ewma = None
+        self.started_at = None              # first use, for the report
+        self.not_before = 0.0               # monotonic time a Retry-After holds requests off until
+        self.successes = 0
+        self.congestion_events = 0
+
+# Defaults replace the old hardcoded sleeps: 1 ms poller floor, 100 ms reserve retry, 1 s elsewhere
+DEFAULT_BUDGETS = {
+    "sign-in":           (1.0,   0.25,  5.0, 300.0),
+    "search-trips-v2":   (1.0,   0.25,  5.0, 600.0),
+    "seat-layout":       (0.001, 0.001, 0.5, None),
+    "reserve-seat":      (0.1,   0.02,  1.0, 60.0),
+    "passenger-details": (1.0,   0.25,  5.0, 120.0),
+    "verify-otp":        (1.0,   0.25,  5.0, 120.0),
+    "confirm":           (1.0,   0.25,  5.0, 120.0),
+}
+
+def parse_budgets(spec):
+    """Parse overrides like "reserve-seat=0.05/0.02/1/30,seat-layout=0.002/0.001/0.2"
+    (start/min/max interval in seconds, optional deadline in seconds)."""
+    budgets = {}
+    for item in filter(None, (part.strip() for part in (spec or "").split(","))):
+        endpoint, _, values = item.partition("=")
+        numbers = [float(value) for value in values.split("/")]
+        if len(numbers) not in (3, 4):
+            raise ValueError(f"Invalid rate limit for {endpoint}: expected start/min/max[/deadline]")
+        budgets[endpoint.strip()] = tuple(numbers) + (None,) * (4 - len(numbers))
+    return budgets
+
+class AdaptiveRateController:
+    RAMP_FACTOR = 0.5        # healthy response below the congestion point: halve the interval
+    ADDITIVE_STEP = 0.1      # healthy response above it: shrink by 10% of the gap to min_interval
+    BACKOFF_FACTOR = 2.0     # congestion: double the interval
+    SPIKE_FACTOR = 3.0       # latency more than 3x the running average counts as congestion
+    EWMA_ALPHA = 0.2
+
+    def __init__(self, overrides=None):
+        self.budgets = {}
+        for endpoint, values in {**DEFAULT_BUDGETS, **(overrides or {})}.items():
+            self.budgets[endpoint] = EndpointBudget(*values)
+
+    def budget(self, endpoint):
+        budget = self.budgets.get(endpoint)
+        if budget is None:
+            budget = self.budgets[endpoint] = EndpointBudget(*DEFAULT_BUDGETS["search-trips-v2"])
+        if budget.started_at is None:
+            budget.started_at = time.monotonic()
+        return budget
+
+    def interval(self, endpoint):
+        """Seconds to wait before the endpoint's next request, including what is left of a Retry-After."""
+        budget = self.budget(endpoint)
+        return max(budget.interval, budget.not_before - time.monotonic())
+
+    def record(self, endpoint, status=None, latency=None, retry_after=None):
+        """Feed back one attempt. `status` None means a connection error or timeout; `retry_after`
+        is the server's Retry-After in seconds, if it sent one."""
+        budget = self.budget(endpoint)
+        congested = is_congestion(status)
+        if retry_after is not None:
+            budget.not_before = max(budget.not_before, time.monotonic() + retry_after)
+        if latency is not None:
+            if budget.latency_ewma is not None and latency > self.SPIKE_FACTOR * budget.latency_ewma:
+                congested = True
+            budget.latency_ewma = latency if budget.latency_ewma is None else \
+                (1 - self.EWMA_ALPHA) * budget.latency_ewma + self.EWMA_ALPHA * latency
+
+        if congested:
+            budget.congestion_events += 1
+            budget.ramp_threshold = budget.interval
+            budget.interval = min(budget.max_interval, budget.interval * self.BACKOFF_FACTOR)
+        else:
+            budget.successes += 1
+            if budget.interval > budget.ramp_threshold * 2:
+                budget.interval *= self.RAMP_FACTOR
+            else:
+                budget.interval -= (budget.interval - budget.min_interval) * self.ADDITIVE_STEP
+            budget.interval = max(budget.min_interval, budget.interval)
+
+    def expired(self, endpoint, since):
+        """Whether retries that started at `since` (a time.monotonic() value) have run past the endpoint's deadline."""
+        budget = self.budget(endpoint)
+        return budget.deadline is not None and time.monotonic() - since > budget.deadline
+
+    async def backoff(self, endpoint, since=None):
+        """Sleep a jittered retry interval. Returns False, without sleeping, once the retries that
+        started at `since` have run past the endpoint's deadline; without `since` there is no deadline."""
+        if since is not None and self.expired(endpoint, since):
+            return False
+        budget = self.budget(endpoint)
+        interval = budget.interval
+        await asyncio.sleep(max(interval / 2 + random.uniform(0, interval / 2), budget.not_before - time.monotonic()))
+        return True
+
+    def report(self):
+        lines = []
+        for endpoint, budget in self.budgets.items():
+            if budget.started_at is None:
+                continue
+            lines.append(f"{endpoint}: interval {budget.interval * 1000:.1f} ms, "
+                         f"{budget.successes} healthy / {budget.congestion_events} congested responses")
+        return lines
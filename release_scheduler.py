@@ -0,0 +1,163 @@
+"""Clock-synchronized release scheduling for the seat-layout poller.
+
+The 422 "ticket purchase ... will be available" message tells us when booking
+opens in server time. Our clock offset to the server is estimated from the
+`Date` header of each response together with its round-trip time, so the
+poller can idle until shortly before the open instant and then burst.
+"""
+import re, time
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+
+# Absolute open time, e.g. "available from 16-Mar-2025 08:00:00 AM" or "available from 08:00 AM"
+_ABSOLUTE_RE = re.compile(
+    r'(?:(\d{1,2})[-/ ]([A-Za-z]{3,9})[-/ ,]+(\d{4})[ ,]+)?'
+    r'(\d{1,2}):(\d{2})(?::(\d{2}))?\s*([AaPp][Mm])?'
+)
+# Relative open time, e.g. "available after 12 minutes 30 seconds"
+_RELATIVE_RE = re.compile(
+    r'(?:(\d+)\s*hours?)?\s*(?:(\d+)\s*minutes?)?\s*(?:(\d+)\s*seconds?)?', re.IGNORECASE
+)
+
+def parse_open_time(message, server_now, server_tz):
+    """Return the booking-open instant (epoch seconds, server clock) stated in a 422 message, or None.
+
+    `server_now` is the current server time as epoch seconds, used for relative
+    messages and for time-of-day messages that carry no date.
+    """
+    if not message:
+        return None
+    tail = message.lower().split("will be available", 1)[-1]
+
+    match = _ABSOLUTE_RE.search(tail)
+    if match:
+        day, month, year, hour, minute, second, meridiem = match.groups()
+        hour, minute, second = int(hour), int(minute), int(second or 0)
+        if meridiem:
+            hour = hour % 12 + (12 if meridiem.lower() == "pm" else 0)
+        if day:
+            try:
+                date = datetime.strptime(f"{day}-{month[:3].title()}-{year}", "%d-%b-%Y").date()
+            except ValueError:
+                return None
+        else:
+            date = datetime.fromtimestamp(server_now, server_tz).date()
+        opens = datetime(date.year, date.month, date.day, hour, minute, second, tzinfo=server_tz)
+        if not day and opens.timestamp() < server_now - 12 * 3600:
+            opens += timedelta(days=1)
+        return opens.timestamp()
+
+    for match in _RELATIVE_RE.finditer(tail):
+        hours, minutes, seconds = match.groups()
+        if hours or minutes or seconds:
+            return server_now + int(hours or 0) * 3600 + int(minutes or 0) * 60 + int(seconds or 0)
+    return None
+
+class ClockOffsetEstimator:
+    """Estimate `server_clock - local_clock` from HTTP `Date` headers.
+
+    A `Date` header truncates the server time to the second, so each response
+    bounds the offset to [date - t_recv, date + 1 - t_send]. Intersecting the
+    bounds over many responses narrows the estimate well below one second.
+    """
+
+    def __init__(self):
+        self.lower = None
+        self.upper = None
+        self.samples = 0
+
+    def observe(self, date_header, t_send, t_recv):
+        """Record one response. `t_send`/`t_recv` are local `time.time()` values around the request."""
+        if not date_header:
+            return
+        try:
+            server_second = parsedate_to_datetime(date_header).timestamp()
+        except (TypeError, ValueError):
+            return
+
+        lower = server_second - t_recv
+        upper = server_second + 1 - t_send
+        self.samples += 1
+        if self.lower is None or lower > self.upper or upper < self.lower:
+            # First sample, or the server clock stepped: start over from this response
+            self.lower, self.upper = lower, upper
+        else:
+            self.lower = max(self.lower, lower)
+            self.upper = min(self.upper, upper)
+
+    @property
+    def offset(self):
+        if self.lower is None:
+            return 0.0
+        return (self.lower + self.upper) / 2
+
+    @property
+    def uncertainty(self):
+        if self.lower is None:
+            return float("inf")
+        return (self.upper - self.lower) / 2
+
+    def server_now(self):
+        return time.time() + self.offset
+
+    def delay_to_second_boundary(self, earliest, rtt):
+        """Delay (>= earliest) for the next probe so its midpoint lands on an estimated server second
+        boundary; such probes split the remaining uncertainty instead of repeating known bounds."""
+        if self.lower is None:
+            return earliest
+        midpoint = time.time() + earliest + rtt / 2 + self.offset
+        return earliest + (1 - midpoint % 1) % 1
+
+class ReleaseScheduler:
+    """Decide how long the poller may idle before booking opens, then time the burst."""
+
+    def __init__(self, burst_window, idle_interval, server_utc_offset_hours):
+        self.burst_window = burst_window
+        self.idle_interval = idle_interval
+        self.server_tz = timezone(timedelta(hours=server_utc_offset_hours))
+        self.clock = ClockOffsetEstimator()
+        self.open_at = None          # booking-open instant, server epoch seconds
+        self.last_rtt = 0.0
+        self.first_success_at = None # server epoch seconds
+
+    def observe_response(self, date_header, t_send, t_recv):
+        self.last_rtt = t_recv - t_send
+        self.clock.observe(date_header, t_send, t_recv)
+
+    def observe_not_open(self, message):
+        """Parse the open instant out of a 'not open yet' message, if it carries one."""
+        open_at = parse_open_time(message, self.clock.server_now(), self.server_tz)
+        if open_at is not None:
+            self.open_at = open_at
+        return open_at
+
+    def seconds_until_open(self):
+        if self.open_at is None:
+            return None
+        return self.open_at - self.clock.server_now()
+
+    def idle_delay(self):
+        """Seconds to sleep before the next poll; 0 once inside the burst window (or when the open time is unknown)."""
+        until_open = self.seconds_until_open()
+        if until_open is None:
+            return 0.0
+        # Aim for the request to land at the open instant minus half a round trip
+        until_burst = until_open - self.burst_window - self.last_rtt / 2
+        if until_burst <= 0:
+            return 0.0
+        if until_burst <= self.idle_interval:
+            return until_burst
+        return min(until_burst, self.clock.delay_to_second_boundary(self.idle_interval, self.last_rtt))
+
+    def record_success(self):
+        if self.first_success_at is None:
+            self.first_success_at = self.clock.server_now()
+
+    def report(self):
+        lines = [f"Estimated server clock offset: {self.clock.offset * 1000:+.1f} ms "
+                 f"(+/- {self.clock.uncertainty * 1000:.1f} ms from {self.clock.samples} responses)"]
+        if self.open_at is not None:
+            lines.append(f"Estimated open instant: {datetime.fromtimestamp(self.open_at, self.server_tz):%d-%b-%Y %I:%M:%S %p}")
+            if self.first_success_at is not None:
+                lines.append(f"First seat layout {(self.first_success_at - self.open_at) * 1000:+.1f} ms after the estimated open instant")
+        return lines
@@ -0,0 +1,30 @@
+"""Requests built once and sent as-is on every attempt.
+
+The seat-layout poller sends the same body thousands of times around the
+open instant, and a reservation is retried with the same body until the
+server answers. Passing `json=` and a URL string to aiohttp re-serializes
+the payload and re-parses the URL on every send. A RequestTemplate holds the
+parsed URL and the encoded body instead, so each attempt only hands
+prebuilt objects to aiohttp. Headers are passed at send time, so a refreshed
+token is picked up without rebuilding the template.
+"""
+import json
+from yarl import URL
+
+JSON_CONTENT_TYPE = "application/json"
+
+class RequestTemplate:
+    __slots__ = ("method", "url", "body")
+
+    def __init__(self, method, url, payload=None, body=None):
+        """`payload` is JSON-encoded once; pass `body` (bytes) instead for a body serialized elsewhere."""
+        self.method = method
+        self.url = url if isinstance(url, URL) else URL(url)
+        self.body = json.dumps(payload).encode() if payload is not None else body
+
+    def send(self, http, headers):
+        """Send on `http` (an aiohttp.ClientSession); use as `async with template.send(http, headers) as response`.
+
+        `headers` must carry the JSON Content-Type when there is a body.
+        """
+        return http.request(self.method, self.url, headers=headers, data=self.body)
@@ -0,0 +1,195 @@
+"""Phase timings, per-endpoint latency histograms and status counters for one booking run.
+
+Phases are timed with `time.perf_counter()` relative to the start of the run.
+Every HTTP request made through the session is observed through an aiohttp
+TraceConfig, so no call site has to remember to report its latency; only
+connection warm-up pings, which are not API calls, are left out. At the
+end of a run the collected data can be written as JSON and as a Prometheus
+text-format file (suitable for node_exporter's textfile collector).
+"""
+import asyncio, json, os, time
+from contextlib import contextmanager
+import aiohttp
+
+# Upper bounds of the latency histogram buckets, in milliseconds
+LATENCY_BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+class EndpointStats:
+    def __init__(self):
+        self.bucket_counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)   # last bucket is +Inf
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.statuses = {}   # status code (or "error" / "cancelled") -> count
+
+    def observe(self, status, latency_ms):
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if latency_ms is None:
+            return
+        self.count += 1
+        self.total_ms += latency_ms
+        self.max_ms = max(self.max_ms, latency_ms)
+        for i, bound in enumerate(LATENCY_BUCKETS_MS):
+            if latency_ms <= bound:
+                self.bucket_counts[i] += 1
+                return
+        self.bucket_counts[-1] += 1
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile (bucket resolution only)."""
+        if not self.count:
+            return None
+        rank, seen = q * self.count, 0
+        for bound, n in zip(LATENCY_BUCKETS_MS + (float("inf"),), self.bucket_counts):
+            seen += n
+            if seen >= rank:
+                return bound if bound != float("inf") else self.max_ms
+        return self.max_ms
+
+class RunMetrics:
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.started_wall = time.time()
+        self.phases = []      # (name, label, start, end) in perf_counter seconds
+        self.endpoints = {}   # endpoint name -> EndpointStats
+
+    # Phases
+
+    def record_phase(self, name, start, end=None, label=None):
+        self.phases.append((name, label, start, time.perf_counter() if end is None else end))
+
+    @contextmanager
+    def phase(self, name, label=None):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_phase(name, start, label=label)
+
+    def phase_totals(self):
+        """Total seconds spent in each phase, in order of first appearance."""
+        totals = {}
+        for name, _, start, end in self.phases:
+            totals[name] = totals.get(name, 0.0) + (end - start)
+        return totals
+
+    # HTTP requests
+
+    def observe(self, endpoint, status, latency_ms=None):
+        stats = self.endpoints.get(endpoint)
+        if stats is None:
+            stats = self.endpoints[endpoint] = EndpointStats()
+        stats.observe(status, latency_ms)
+
+    def trace_config(self):
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(self._on_request_start)
+        trace_config.on_request_end.append(self._on_request_end)
+        trace_config.on_request_exception.append(self._on_request_exception)
+        return trace_config
+
+    @staticmethod
+    def is_warmup(ctx):
+        return isinstance(ctx.trace_request_ctx, dict) and ctx.trace_request_ctx.get("warmup", False)
+
+    @staticmethod
+    def endpoint_name(url):
+        path = url.path.rstrip("/")
+        return path.rsplit("/", 1)[-1] or "/"
+
+    async def _on_request_start(self, session, ctx, params):
+        ctx.request_start = time.perf_counter()
+
+    async def _on_request_end(self, session, ctx, params):
+        if self.is_warmup(ctx):
+            return
+        # Headers received: latency to first byte, the body is read by the caller
+        self.observe(self.endpoint_name(params.url), params.response.status,
+                     (time.perf_counter() - ctx.request_start) * 1000)
+
+    async def _on_request_exception(self, session, ctx, params):
+        if self.is_warmup(ctx):
+            return
+        # Requests abandoned on purpose (losing hedges, cancelled pollers) are not failures. Neither they nor
+        # errors got a response, so they only count by status and stay out of the latency histogram
+        status = "cancelled" if isinstance(params.exception, asyncio.CancelledError) else "error"
+        self.observe(self.endpoint_name(params.url), status)
+
+    # Reports
+
+    def to_dict(self):
+        return {
+            "started_at": self.started_wall,
+            "duration_ms": (time.perf_counter() - self.started_at) * 1000,
+            "phases": [
+                {"phase": name, "label": label,
+                 "start_ms": (start - self.started_at) * 1000, "duration_ms": (end - start) * 1000}
+                for name, label, start, end in self.phases
+            ],
+            "phase_totals_ms": {name: seconds * 1000 for name, seconds in self.phase_totals().items()},
+            "endpoints": {
+                endpoint: {
+                    "count": stats.count,
+                    "mean_ms": stats.total_ms / stats.count if stats.count else None,
+                    "p50_ms": stats.quantile(0.5),
+                    "p90_ms": stats.quantile(0.9),
+                    "p99_ms": stats.quantile(0.99),
+                    "max_ms": stats.max_ms,
+                    "histogram_ms": dict(zip([str(b) for b in LATENCY_BUCKETS_MS] + ["+Inf"], stats.bucket_counts)),
+                    "statuses": {str(status): n for status, n in stats.statuses.items()},
+                }
+                for endpoint, stats in self.endpoints.items()
+            },
+        }
+
+    def to_prometheus(self):
+        lines = [
+            "# HELP bdrail_http_request_duration_seconds Time to response headers per endpoint.",
+            "# TYPE bdrail_http_request_duration_seconds histogram",
+        ]
+        for endpoint, stats in self.endpoints.items():
+            cumulative = 0
+            for bound, n in zip(LATENCY_BUCKETS_MS + (None,), stats.bucket_counts):
+                cumulative += n
+                le = "+Inf" if bound is None else repr(bound / 1000)
+                lines.append(f'bdrail_http_request_duration_seconds_bucket{{endpoint="{endpoint}",le="{le}"}} {cumulative}')
+            lines.append(f'bdrail_http_request_duration_seconds_sum{{endpoint="{endpoint}"}} {stats.total_ms / 1000:.6f}')
+            lines.append(f'bdrail_http_request_duration_seconds_count{{endpoint="{endpoint}"}} {stats.count}')
+        lines += [
+            "# HELP bdrail_http_responses_total Requests per endpoint and status code (\"error\" for connection failures, \"cancelled\" for abandoned requests).",
+            "# TYPE bdrail_http_responses_total counter",
+        ]
+        for endpoint, stats in self.endpoints.items():
+            for status, n in stats.statuses.items():
+                lines.append(f'bdrail_http_responses_total{{endpoint="{endpoint}",status="{status}"}} {n}')
+        lines += [
+            "# HELP bdrail_phase_duration_seconds Total time spent in each booking phase.",
+            "# TYPE bdrail_phase_duration_seconds gauge",
+        ]
+        for name, seconds in self.phase_totals().items():
+            lines.append(f'bdrail_phase_duration_seconds{{phase="{name}"}} {seconds:.6f}')
+        return "\n".join(lines) + "\n"
+
+    def write(self, json_path=None, prometheus_path=None):
+        """Write the reports that have a path. Files are replaced atomically."""
+        for path, text in ((json_path, lambda: json.dumps(self.to_dict(), indent=2)),
+                           (prometheus_path, self.to_prometheus)):
+            if not path:
+                continue
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(text())
+            os.replace(tmp_path, path)
+
+    def summary(self):
+        counts = {}
+        for name, *_ in self.phases:
+            counts[name] = counts.get(name, 0) + 1
+        lines = [f"{name}: {seconds * 1000:.1f} ms" + (f" over {counts[name]} calls" if counts[name] > 1 else "")
+                 for name, seconds in self.phase_totals().items()]
+        for endpoint, stats in self.endpoints.items():
+            if stats.count:
+                statuses = ", ".join(f"{status}x{n}" for status, n in stats.statuses.items())
+                lines.append(f"{endpoint}: {stats.count} requests, mean {stats.total_ms / stats.count:.1f} ms, "
+                             f"p90 <= {stats.quantile(0.9):g} ms, max {stats.max_ms:.1f} ms ({statuses})")
+        return lines
@@ -0,0 +1,215 @@
+"""Indexed view of a seat-layout response for fast seat selection.
+
+The layout is walked once into a flat list of the available seats with row
+and coach boundaries. Numeric seat positions, per-coach sorted seats and the
+seat-number lookup are derived from it on first use, so each selection
+strategy only pays for the structures it queries. Seat selection then runs
+against these arrays instead of rescanning the nested layout dicts. The
+cancellation watch reduces whole layouts to availability bitmaps with
+`availability_flags` and `flags_to_bitmap`, without building an index.
+"""
+
+import heapq
+from bisect import bisect_right
+
+_ASCII_BITS = bytes.maketrans(b'\x00\x01', b'01')
+_AVAILABLE = bytes(value == 1 for value in range(256))
+
+def availability_flags(seat_layout):
+    """One byte per seat of the layout in layout order: 1 when the seat is available, else 0."""
+    values = [seat['seat_availability'] for coach in seat_layout for row in coach['layout'] for seat in row]
+    try:
+        # Small integer codes map straight through a translation table, without a Python-level comparison per seat
+        return bytes(values).translate(_AVAILABLE)
+    except (TypeError, ValueError):
+        return bytes([value == 1 for value in values])
+
+def flags_to_bitmap(flags):
+    """Pack `availability_flags` into an int with bit i set when seat i is available."""
+    return int(flags[::-1].translate(_ASCII_BITS) or b'0', 2)
+
+def seat_position(seat_number, fallback):
+    """Numeric part of a seat number such as "UMA-12"."""
+    try:
+        return int(seat_number.rpartition('-')[2])
+    except ValueError:
+        return fallback
+
+class SeatIndex:
+    """Available seats are numbered 0..n-1 in layout order; `seats[i]` is the
+    seat dict from the response and each row is a [start, end) range of it."""
+
+    def __init__(self, seat_layout):
+        self.seat_layout = seat_layout
+        self.seats = []
+        self.row_starts = []
+        self.coach_names = []
+        self.coach_ranges = []   # per coach: [first, end) range of available seats
+        self._numbers = None
+        self._coach_seats = None
+        self._by_number = None
+        self._coach_starts = None
+
+        seats, row_starts = self.seats, self.row_starts
+        for coach in seat_layout:
+            self.coach_names.append(coach.get('floor_name'))
+            first = len(seats)
+            for row in coach['layout']:
+                row_starts.append(len(seats))
+                seats += [seat for seat in row if seat['seat_availability'] == 1]
+            self.coach_ranges.append((first, len(seats)))
+        row_starts.append(len(seats))
+
+    def __len__(self):
+        return len(self.seats)
+
+    def ticket_id(self, i):
+        return self.seats[i]['ticket_id']
+
+    def seat_number(self, i):
+        return self.seats[i]['seat_number']
+
+    def row_range(self, i):
+        """The [start, end) range of available seats in seat i's row."""
+        row = bisect_right(self.row_starts, i) - 1
+        return self.row_starts[row], self.row_starts[row + 1]
+
+    @property
+    def numbers(self):
+        """Numeric seat position of each available seat, parsed on first use."""
+        if self._numbers is None:
+            try:
+                self._numbers = [int(seat['seat_number'].rpartition('-')[2]) for seat in self.seats]
+            except ValueError:
+                self._numbers = [seat_position(seat['seat_number'], i) for i, seat in enumerate(self.seats)]
+        return self._numbers
+
+    @property
+    def coach_seats(self):
+        """Per coach: available seat indices sorted by numeric seat position."""
+        if self._coach_seats is None:
+            key = self.numbers.__getitem__
+            self._coach_seats = [sorted(range(first, end), key=key) for first, end in self.coach_ranges]
+        return self._coach_seats
+
+    def coach_of(self, i):
+        """Index of the coach that available seat i is in."""
+        if self._coach_starts is None:
+            self._coach_starts = [first for first, _ in self.coach_ranges]
+        return bisect_right(self._coach_starts, i) - 1
+
+    def available_seat(self, seat_number):
+        """Index of `seat_number` if it is available, else None."""
+        if self._by_number is None:
+            self._by_number = {}
+            for i, seat in enumerate(self.seats):
+                self._by_number.setdefault(seat['seat_number'], i)
+        return self._by_number.get(seat_number)
+
+    def contiguous_block(self, coach_index, size, start, stop):
+        """First window start in [start, stop) whose `size` seats have consecutive seat numbers, or None."""
+        seats = self.coach_seats[coach_index]
+        numbers = self.numbers
+        for i in range(start, stop):
+            if numbers[seats[i + size - 1]] - numbers[seats[i]] == size - 1:
+                return i
+        return None
+
+def select_seats(index, desired_seats, max_selectable_seat):
+    """Pick up to `max_selectable_seat` seats. Returns {ticket_id: seat_number} in selection order."""
+    return {index.ticket_id(i): index.seat_number(i) for i in _select(index, desired_seats, max_selectable_seat)}
+
+def _select(index, desired_seats, max_selectable_seat):
+    """The `select_seats` choice as available-seat indices, in selection order.
+
+    With desired seats: the available desired seats, then their nearest available
+    neighbours in the same row, then any available seat. Without: a contiguous
+    block near the middle of a coach, then seats paired outwards from the middle
+    of each coach in turn.
+    """
+    selected = []
+    taken = set()
+
+    def take(i):
+        if i in taken:
+            return False
+        taken.add(i)
+        selected.append(i)
+        return len(selected) == max_selectable_seat
+
+    if desired_seats:
+        # Step 1: the desired seats themselves, in layout order
+        desired = sorted({i for i in map(index.available_seat, desired_seats) if i is not None})
+        for i in desired:
+            if take(i):
+                return selected
+
+        # Step 2: nearest available neighbours of each desired seat within its row
+        desired_order = {seat_number: n for n, seat_number in enumerate(desired_seats)}
+        for i in sorted(desired, key=lambda i: (index.row_range(i)[0], desired_order[index.seat_number(i)])):
+            start, end = index.row_range(i)
+            for offset in range(1, end - start):
+                if i + offset < end and take(i + offset):
+                    return selected
+                if i - offset >= start and take(i - offset):
+                    return selected
+
+        # Step 3: any remaining available seat
+        for i in range(len(index)):
+            if take(i):
+                return selected
+        return selected
+
+    # Step 1: a contiguous block around the middle of a coach
+    for coach_index, seats in enumerate(index.coach_seats):
+        mid = len(seats) // 2
+        start = index.contiguous_block(coach_index, max_selectable_seat,
+                                       max(0, mid - max_selectable_seat),
+                                       min(mid + 1, len(seats) - max_selectable_seat + 1))
+        if start is not None:
+            for i in seats[start:start + max_selectable_seat]:
+                take(i)
+            return selected
+
+    # Step 2: symmetric pairing outwards from the middle of each coach in turn
+    for seats in index.coach_seats:
+        left = len(seats) // 2 - 1
+        right = left + 1
+        while left >= 0 or right < len(seats):
+            if left >= 0:
+                if take(seats[left]):
+                    return selected
+                left -= 1
+            if right < len(seats):
+                if take(seats[right]):
+                    return selected
+                right += 1
+    return selected
+
+def rank_seats(index, desired_seats, max_selectable_seat, limit):
+    """Up to `limit` seats in preference order: the `select_seats` choice first, then spares
+    closest to it - in a row of the choice, then in a coach of the choice by seat-number
+    distance, then in other coaches in the order `select_seats` would fall back to them."""
+    primary = _select(index, desired_seats, max_selectable_seat)
+    ranked = {index.ticket_id(i): index.seat_number(i) for i in primary}
+    spares = min(limit, len(index)) - len(ranked)
+    if spares <= 0:
+        return ranked
+
+    numbers = index.numbers
+    rows = {index.row_range(i)[0] for i in primary}
+    by_coach = {}
+    for i in primary:
+        by_coach.setdefault(index.coach_of(i), []).append(numbers[i])
+    fallback = {i: n for n, i in enumerate(_select(index, desired_seats, len(index)))}
+
+    def distance(i):
+        near = by_coach.get(index.coach_of(i))
+        if near is None:
+            return 2, 0, fallback[i]
+        return (0 if index.row_range(i)[0] in rows else 1), min(abs(numbers[i] - n) for n in near), fallback[i]
+
+    chosen = set(primary)
+    for i in heapq.nsmallest(spares, (i for i in range(len(index)) if i not in chosen), key=distance):
+        ranked[index.ticket_id(i)] = index.seat_number(i)
+    return ranked
@@ -0,0 +1,98 @@
+"""Persistent auth token cache keyed by mobile number.
+
+Tokens are stored with their decoded user info and `exp` claim, reused while
+they stay valid for at least `min_validity` seconds, and rewritten atomically
+so a crash never leaves a half-written cache behind.
+"""
+import json, os, time
+from contextlib import contextmanager
+import jwt
+from jwt import DecodeError
+
+try:
+    import fcntl
+except ImportError:   # Windows
+    fcntl = None
+    import msvcrt
+
+def decode_token(token):
+    """Decode a JWT's claims without verifying the signature. Returns {} if it cannot be decoded."""
+    try:
+        return jwt.decode(token, options={"verify_signature": False}, algorithms=["RS256"])
+    except DecodeError:
+        return {}
+
+def user_info(claims):
+    return {
+        "email": claims.get("email", ""),
+        "phone_number": claims.get("phone_number", ""),
+        "display_name": claims.get("display_name", ""),
+    }
+
+class TokenCache:
+    def __init__(self, path, min_validity=60.0):
+        self.path = path
+        self.min_validity = min_validity
+
+    def _read(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    @contextmanager
+    def _locked(self):
+        """Hold an exclusive lock on the cache across a read-modify-write, so concurrent
+        bookings in other processes (see orchestrator.py) do not drop each other's entries."""
+        fd = os.open(f"{self.path}.lock", os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            if fcntl:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            else:
+                msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+            os.close(fd)
+
+    def _write(self, cache):
+        # Owner-only permissions: the file holds live bearer tokens. The temporary file is per
+        # process so concurrent bookings (see orchestrator.py) never write into the same one.
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w", encoding="utf-8") as f:
+            json.dump(cache, f)
+        os.replace(tmp_path, self.path)
+
+    def get(self, mobile_number):
+        """Return the cached token entry for `mobile_number` if it is still valid, else None."""
+        entry = self._read().get(mobile_number)
+        if not entry or not entry.get("token"):
+            return None
+        expires_at = entry.get("exp")
+        if expires_at is None or expires_at - time.time() < self.min_validity:
+            return None
+        return entry
+
+    def put(self, mobile_number, token):
+        """Store `token` for `mobile_number` and return the stored entry. Tokens that cannot be
+        decoded or carry no `exp` claim are not cached (None is returned): they could never expire."""
+        claims = decode_token(token)
+        if claims.get("exp") is None:
+            return None
+        entry = {"token": token, "exp": claims.get("exp"), "user": user_info(claims), "stored_at": time.time()}
+        with self._locked():
+            cache = self._read()
+            cache[mobile_number] = entry
+            self._write(cache)
+        return entry
+
+    def discard(self, mobile_number):
+        with self._locked():
+            cache = self._read()
+            if cache.pop(mobile_number, None) is not None:
+                self._write(cache)
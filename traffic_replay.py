@@ -0,0 +1,257 @@
+"""Record API traffic during a real run and replay it locally.
+
+TrafficRecorder is an aiohttp TraceConfig: every request made through the
+session is kept with its monotonic start time, latency to headers, status,
+Date/Content-Type headers and both bodies, with no change to the call sites.
+The hot loop only appends chunks; redaction and serialization happen when
+the recording is written. Credentials, tokens, OTPs, passenger details and
+payment links are redacted. Identical response bodies (the same 422 a
+thousand times) are stored once. The file is gzip-compressed JSON lines.
+
+Replay serves a recording back as a local server. Each request gets the
+recorded response for the same method, path and body, or failing that the
+same method and path, that was current at the same moment of the run. The
+clock starts at the first request and runs at `speed` times the original
+pace, and recorded latencies are slept off at that speed. Date headers
+follow the recorded server clock, so the release countdown replays as it
+happened. Sign-in is always answered with a freshly minted token, since
+recorded tokens are redacted.
+
+    RECORD_TRAFFIC=bdrail_traffic.jsonl.gz python BDRail.py
+    python traffic_replay.py bdrail_traffic.jsonl.gz --speed 1 --port 8090
+"""
+import argparse, asyncio, bisect, gzip, json, os, re, time
+from email.utils import formatdate, parsedate_to_datetime
+from urllib.parse import parse_qsl, urlencode, urlparse
+import aiohttp
+import jwt
+from aiohttp import web
+
+REDACTED = "<redacted>"
+REDACTED_TOKEN = "<redacted-token>"
+SENSITIVE_KEYS = {"mobile_number", "password", "token", "otp", "phone_number", "email", "display_name",
+                  "pmobile", "pemail", "pname", "redirectUrl"}
+JWT_PATTERN = re.compile(r"eyJ[\w-]+\.[\w-]+\.[\w-]*")
+REPLAY_JWT_SECRET = "bdrail-replay-signing-key-not-a-secret"
+
+def _redact_value(value):
+    """Redact sensitive keys in decoded JSON. Returns (value, changed)."""
+    if isinstance(value, dict):
+        changed = False
+        redacted = {}
+        for key, item in value.items():
+            if key in SENSITIVE_KEYS and item not in (None, "", []):
+                # Tokens keep a marker of their own so replay can swap in a freshly minted one
+                redacted[key] = REDACTED_TOKEN if isinstance(item, str) and JWT_PATTERN.fullmatch(item) else REDACTED
+                changed = True
+            else:
+                redacted[key], item_changed = _redact_value(item)
+                changed = changed or item_changed
+        return redacted, changed
+    if isinstance(value, list):
+        items = [_redact_value(item) for item in value]
+        return [item for item, _ in items], any(changed for _, changed in items)
+    return value, False
+
+def redact_body(body, content_type=""):
+    """Body text with credentials and personal data replaced. JSON and form bodies are redacted by key, JWTs anywhere."""
+    text = body.decode(errors="replace") if isinstance(body, bytes) else body
+    if "json" in content_type or text[:1] in ("{", "["):
+        try:
+            value, changed = _redact_value(json.loads(text))
+            if changed:
+                text = json.dumps(value)
+        except ValueError:
+            pass
+    elif "form" in content_type or (not content_type and "=" in text):
+        fields = parse_qsl(text, keep_blank_values=True)
+        text = urlencode([(key, REDACTED if key in SENSITIVE_KEYS else value) for key, value in fields])
+    return JWT_PATTERN.sub(REDACTED_TOKEN, text)
+
+class TrafficRecorder:
+    def __init__(self, path, api_base_url=""):
+        self.path = path
+        self.api_base_path = urlparse(api_base_url).path.rstrip("/")
+        self.started_at = time.perf_counter()
+        self.started_wall = time.time()
+        self.exchanges = []
+
+    def trace_config(self):
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(self._on_request_start)
+        trace_config.on_request_chunk_sent.append(self._on_request_chunk_sent)
+        trace_config.on_request_end.append(self._on_request_end)
+        trace_config.on_response_chunk_received.append(self._on_response_chunk_received)
+        trace_config.on_request_exception.append(self._on_request_exception)
+        return trace_config
+
+    async def _on_request_start(self, session, ctx, params):
+        ctx.exchange = {"start": time.perf_counter(), "method": params.method, "url": params.url,
+                        "request": [], "response": [], "request_type": params.headers.get("Content-Type", "")}
+
+    async def _on_request_chunk_sent(self, session, ctx, params):
+        ctx.exchange["request"].append(params.chunk)
+
+    async def _on_request_end(self, session, ctx, params):
+        exchange = ctx.exchange
+        exchange["latency"] = time.perf_counter() - exchange["start"]
+        exchange["status"] = params.response.status
+        exchange["headers"] = {name: params.response.headers[name] for name in ("Date", "Content-Type") if name in params.response.headers}
+        self.exchanges.append(exchange)   # the body keeps arriving in the same dict
+
+    async def _on_response_chunk_received(self, session, ctx, params):
+        ctx.exchange["response"].append(params.chunk)
+
+    async def _on_request_exception(self, session, ctx, params):
+        # Kept for the timeline; replay never serves them
+        exchange = ctx.exchange
+        exchange["latency"] = time.perf_counter() - exchange["start"]
+        exchange["status"] = "cancelled" if isinstance(params.exception, asyncio.CancelledError) else "error"
+        exchange["headers"] = {}
+        self.exchanges.append(exchange)
+
+    def write(self):
+        """Redact and write everything recorded so far. The file is replaced atomically."""
+        bodies = {}
+        tmp_path = f"{self.path}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            f.write(json.dumps({"recording": 1, "started_at": self.started_wall, "api_base_path": self.api_base_path}) + "\n")
+            for exchange in self.exchanges:
+                response = redact_body(b"".join(exchange["response"]), exchange["headers"].get("Content-Type", ""))
+                if response not in bodies:
+                    bodies[response] = len(bodies)
+                    f.write(json.dumps({"body": bodies[response], "text": response}) + "\n")
+                url = exchange["url"]
+                f.write(json.dumps({
+                    "t": round(exchange["start"] - self.started_at, 6),
+                    "latency": round(exchange["latency"], 6),
+                    "method": exchange["method"],
+                    "path": url.path,
+                    "query": redact_body(url.query_string, "form") if url.query_string else "",
+                    "request": redact_body(b"".join(exchange["request"]), exchange["request_type"]),
+                    "status": exchange["status"],
+                    "headers": exchange["headers"],
+                    "response": bodies[response],
+                }) + "\n")
+        os.replace(tmp_path, self.path)
+
+class Recording:
+    def __init__(self, header, exchanges):
+        self.header = header
+        self.exchanges = exchanges   # served exchanges, in time order
+        self.by_route = {}           # (method, path) -> exchanges
+        self.by_request = {}         # (method, path, request body) -> exchanges
+        for exchange in exchanges:
+            self.by_route.setdefault((exchange["method"], exchange["path"]), []).append(exchange)
+            self.by_request.setdefault((exchange["method"], exchange["path"], exchange["request"]), []).append(exchange)
+        self.times = {key: [exchange["t"] for exchange in group] for key, group in list(self.by_route.items()) + list(self.by_request.items())}
+        # Server clock = recorded time + offset; Date has one-second resolution, so take the tightest sample
+        offsets = [parsedate_to_datetime(exchange["headers"]["Date"]).timestamp() - exchange["t"]
+                   for exchange in exchanges if "Date" in exchange["headers"]]
+        self.server_offset = max(offsets) if offsets else header.get("started_at", time.time())
+
+    @classmethod
+    def load(cls, path):
+        bodies = {}
+        exchanges = []
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            header = json.loads(f.readline())
+            for line in f:
+                entry = json.loads(line)
+                if "body" in entry:
+                    bodies[entry["body"]] = entry["text"]
+                elif isinstance(entry["status"], int):
+                    entry["response"] = bodies[entry["response"]]
+                    exchanges.append(entry)
+        exchanges.sort(key=lambda exchange: exchange["t"])
+        return cls(header, exchanges)
+
+    def lookup(self, method, path, request, t):
+        """The recorded exchange to answer with at recording time `t`, or None."""
+        for key, groups in (((method, path, request), self.by_request), ((method, path), self.by_route)):
+            group = groups.get(key)
+            if group:
+                i = bisect.bisect_right(self.times[key], t)
+                return group[max(i - 1, 0)]
+        return None
+
+class ReplayState:
+    def __init__(self, recording, speed):
+        self.recording = recording
+        self.speed = speed
+        self.first_request_at = None
+        self.served = 0
+        self.unmatched = 0
+
+    def recording_time(self):
+        """Where the replay is on the recording's timeline; the first request lines up with the first recorded one."""
+        now = time.perf_counter()
+        if self.first_request_at is None:
+            self.first_request_at = now
+        start = self.recording.exchanges[0]["t"] if self.recording.exchanges else 0.0
+        return start + (now - self.first_request_at) * self.speed
+
+def replay_token():
+    now = int(time.time())
+    claims = {"sub": "replay", "phone_number": "", "email": "", "display_name": "Replay Passenger", "iat": now, "exp": now + 3600}
+    return jwt.encode(claims, REPLAY_JWT_SECRET, algorithm="HS256")
+
+async def replay(request):
+    state = request.app["state"]
+    t = state.recording_time()
+    body = await request.read()
+    if request.path.endswith("/auth/sign-in"):
+        # Recorded tokens are redacted and the run may have used a cached one, so sign-in always gets a fresh token
+        state.served += 1
+        return web.json_response({"data": {"token": replay_token()}})
+    exchange = state.recording.lookup(request.method, request.path, redact_body(body, request.content_type), t)
+    if exchange is None:
+        state.unmatched += 1
+        return web.Response(status=404, text="not in recording\n")
+
+    state.served += 1
+    await asyncio.sleep(exchange["latency"] / state.speed)
+    text = exchange["response"].replace(REDACTED_TOKEN, replay_token()) if REDACTED_TOKEN in exchange["response"] else exchange["response"]
+    headers = {"Date": formatdate(state.recording.server_offset + state.recording_time(), usegmt=True)}
+    if "Content-Type" in exchange["headers"]:
+        headers["Content-Type"] = exchange["headers"]["Content-Type"]
+    return web.Response(status=exchange["status"], body=text.encode(), headers=headers)
+
+async def start_replay_server(recording, host="127.0.0.1", port=8090, speed=1.0):
+    """Serve `recording` on the running loop. Returns (runner, app); call runner.cleanup() to stop."""
+    app = web.Application()
+    app["state"] = ReplayState(recording, speed)
+    app.router.add_route("*", "/{tail:.*}", replay)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner, app
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a recorded booking run back locally.")
+    parser.add_argument("recording", help="file written with RECORD_TRAFFIC")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed (2 = twice as fast)")
+    args = parser.parse_args()
+    recording = Recording.load(args.recording)
+
+    async def serve():
+        runner, app = await start_replay_server(recording, args.host, args.port, args.speed)
+        duration = recording.exchanges[-1]["t"] - recording.exchanges[0]["t"] if recording.exchanges else 0.0
+        print(f"Replaying {len(recording.exchanges)} exchanges ({duration:.1f}s recorded) at {args.speed:g}x")
+        print(f"API_BASE_URL=http://{args.host}:{args.port}{recording.header.get('api_base_path', '')}")
+        try:
+            await asyncio.Event().wait()
+        finally:
+            state = app["state"]
+            print(f"Served {state.served} responses, {state.unmatched} requests not in the recording")
+            await runner.cleanup()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
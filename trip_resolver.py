@@ -0,0 +1,69 @@
+"""Resolve a prioritized list of acceptable (train, seat class) pairs from one search response.
+
+The `search-trips-v2` response is indexed once by (train number, seat class),
+every preference is looked up in that index, and the matches come back in
+preference order. Search responses are cached for a short time in a
+SearchCache that all sessions of a process can share: sessions searching
+the same route and date at once (orchestrated jobs starting together) send
+one request between them and resolve their own preferences against it.
+"""
+import asyncio, time
+from collections import namedtuple
+
+TripOption = namedtuple("TripOption", "rank train_number seat_class trip_id trip_route_id boarding_point_id train_name")
+
+def parse_preferences(spec, default_train, default_class):
+    """Parse "705:S_CHAIR,705:SNIGDHA,753" into [("705", "S_CHAIR"), ("705", "SNIGDHA"), ("753", default_class)]."""
+    preferences = []
+    for item in filter(None, (part.strip() for part in (spec or "").split(","))):
+        train, _, seat_class = item.partition(":")
+        preferences.append((train.strip(), seat_class.strip() or default_class))
+    if not preferences:
+        preferences.append((str(default_train), default_class))
+    return preferences
+
+def index_trains(trains):
+    """Map (train number, seat class) -> TripOption fields for every seat type in the response."""
+    index = {}
+    for train in trains:
+        train_number = str(train.get('train_model'))
+        boarding_point_id = (train.get('boarding_points') or [{}])[0].get('trip_point_id')
+        for seat in train.get('seat_types', []):
+            index.setdefault((train_number, seat.get('type')), (
+                seat.get('trip_id'), seat.get('trip_route_id'), boarding_point_id, train.get('trip_number')))
+    return index
+
+def resolve_trips(index, preferences):
+    """Return the preferences present in `index` as TripOptions, best first."""
+    options = []
+    for train_number, seat_class in preferences:
+        match = index.get((train_number, seat_class))
+        if match and match[0] and match[1]:
+            options.append(TripOption(len(options), train_number, seat_class, *match))
+    return options
+
+class SearchCache:
+    """Keep recent search responses (already indexed) keyed by route, date and class."""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self.entries = {}
+        self.locks = {}
+
+    def lock(self, key):
+        """Lock held while searching for `key`, so concurrent sessions wait for one request instead of each sending one."""
+        lock = self.locks.get(key)
+        if lock is None:
+            lock = self.locks[key] = asyncio.Lock()
+        return lock
+
+    def get(self, key, newer_than=None):
+        """(fetched_at, index) of the search for `key` if it is within the TTL and fetched after `newer_than`, else None."""
+        entry = self.entries.get(key)
+        if entry and time.monotonic() - entry[0] <= self.ttl and (newer_than is None or entry[0] > newer_than):
+            return entry
+        return None
+
+    def put(self, key, index):
+        entry = self.entries[key] = (time.monotonic(), index)
+        return entry